@@ -1,14 +1,33 @@
 import os
+import time
 
-from celery import Celery
-from celery.signals import worker_init
+from celery import Celery, Task
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+)
 from django.conf import settings
 
+from configurations.timing import timed
+
 # Set default Django settings
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "configurations.settings")
 
+
+class TimedTask(Task):
+    """
+    Task reporting enqueueing as the `celery` Server-Timing phase.
+    """
+
+    def apply_async(self, *args, **kwargs):
+        with timed("celery"):
+            return super().apply_async(*args, **kwargs)
+
+
 # Create celery app
-app = Celery(settings.CELERY_SERVICE_NAME)
+app = Celery(settings.CELERY_SERVICE_NAME, task_cls=TimedTask)
 
 
 # Initialize telemetry
@@ -21,14 +40,92 @@ def worker_init(**kwargs):
         from configurations.telemetry import init_telemetry
 
         print(f"Inintializing telemetry for {settings.CELERY_SERVICE_NAME}...")
-        init_telemetry(
+        if init_telemetry(
             service_name=settings.CELERY_SERVICE_NAME,
-        )
-        print("Telemetry initialized successfully.")
+        ):
+            print("Telemetry initialized successfully.")
+        else:
+            print("Telemetry is disabled, OTEL_EXPORTER_OTLP_ENDPOINT is not set.")
     except ImportError as e:
         print(f"Telemetry initialization failed: {e}")
 
 
+# Task metrics
+@before_task_publish.connect()
+def stamp_published_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault("published_at", time.time())
+
+
+@task_prerun.connect()
+def start_task_timer(task=None, **kwargs):
+    from configurations.metrics import task_queue_wait
+
+    published_at = getattr(task.request, "published_at", None)
+    if published_at:
+        wait = max(time.time() - published_at, 0)
+        task_queue_wait.record(wait * 1000, {"celery.task": task.name})
+    task.request.started_at = time.perf_counter()
+
+
+@task_postrun.connect()
+def stop_task_timer(task=None, state=None, **kwargs):
+    from configurations.metrics import task_duration
+
+    started_at = getattr(task.request, "started_at", None)
+    if started_at:
+        # Failed and retried runs end here too, never time a run twice.
+        task.request.started_at = None
+        duration = time.perf_counter() - started_at
+        task_duration.record(
+            duration * 1000, {"celery.task": task.name, "celery.state": state or ""}
+        )
+
+
+# Trace propagation
+@before_task_publish.connect()
+def stamp_trace_context(headers=None, **kwargs):
+    """
+    Carry the trace of the publisher in the task headers, so the logs of the
+    worker can be joined with the request that enqueued the task even when
+    the worker does not record a span for it.
+    """
+    from opentelemetry.trace.propagation.tracecontext import (
+        TraceContextTextMapPropagator,
+    )
+
+    from configurations.logging import get_trace_ids
+
+    trace_ids = get_trace_ids()
+    if headers is None or trace_ids is None:
+        return
+    headers.setdefault("trace_id", trace_ids[0])
+    headers.setdefault("parent_span_id", trace_ids[1])
+    if "traceparent" not in headers:
+        TraceContextTextMapPropagator().inject(headers)
+
+
+@task_prerun.connect()
+def bind_log_context(task=None, task_id=None, **kwargs):
+    from configurations.logging import log_context
+
+    context = {"task": task.name, "task_id": task_id}
+    trace_id = getattr(task.request, "trace_id", None)
+    if trace_id:
+        context["trace_id"] = trace_id
+        context["parent_span_id"] = getattr(task.request, "parent_span_id", None)
+    task.request.log_context_token = log_context.set(context)
+
+
+@task_postrun.connect()
+def unbind_log_context(task=None, **kwargs):
+    from configurations.logging import log_context
+
+    token = getattr(task.request, "log_context_token", None)
+    if token is not None:
+        log_context.reset(token)
+
+
 # Load celery config from django settings
 app.config_from_object("django.conf:settings", namespace="CELERY")
 
@@ -0,0 +1,75 @@
+import logging
+from collections import deque
+from threading import Event
+from time import time_ns
+from typing import Callable
+
+from opentelemetry.trace import Span
+
+from configurations.metrics import span_event_queue
+from utils.threads import ProcessThread
+
+logger = logging.getLogger(__name__)
+
+
+class EventQueue:
+    """
+    Bounded queue of span events built on a background thread.
+
+    Producers only append a reference to the span, a builder and its raw
+    arguments, so the request thread never pays for formatting. `deque`
+    appends and pops are atomic, so producers never take a lock. When the
+    queue is full new events are dropped, and events whose span has already
+    ended by the time the worker gets to them are dropped as late. Every
+    outcome is counted in `counters` and exported as a metric.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.counters = {"queued": 0, "attached": 0, "dropped": 0, "late": 0}
+        self._items = deque()
+        self._wakeup = Event()
+        self._worker = ProcessThread(
+            self._run, name="span-events", on_start=self._items.clear
+        )
+
+    def count(self, result: str):
+        self.counters[result] += 1
+        span_event_queue.add(1, {"result": result})
+
+    def put(self, span: Span, message: str, build: Callable, *args) -> bool:
+        self._worker.ensure_started()
+        if len(self._items) >= self.max_size:
+            self.count("dropped")
+            return False
+        self._items.append((span, message, time_ns(), build, args))
+        self.count("queued")
+        self._wakeup.set()
+        return True
+
+    def process(
+        self, span: Span, message: str, timestamp: int, build: Callable, args: tuple
+    ):
+        if not span.is_recording():
+            self.count("late")
+            return
+        try:
+            attributes = build(*args)
+        except Exception as e:
+            self.count("dropped")
+            logger.warning(f"Failed to build span event: {e}")
+            return
+        if attributes:
+            # Keep the time the event happened, not the time it was built.
+            span.add_event(name=message, attributes=attributes, timestamp=timestamp)
+            self.count("attached")
+
+    def drain(self):
+        while self._items:
+            self.process(*self._items.popleft())
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.drain()
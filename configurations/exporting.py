@@ -0,0 +1,167 @@
+import logging
+from typing import Optional, Sequence
+
+import grpc
+from opentelemetry import metrics
+from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+
+COMPRESSIONS = {
+    "gzip": grpc.Compression.Gzip,
+    "deflate": grpc.Compression.Deflate,
+    "none": grpc.Compression.NoCompression,
+}
+DROPPED_EVENTS = "otel.dropped_events_count"
+
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+exported_spans = meter.create_counter(
+    "tracing.spans.exported",
+    unit="{span}",
+    description="Spans handed to the exporter, by result",
+)
+dropped_spans = meter.create_counter(
+    "tracing.spans.dropped",
+    unit="{span}",
+    description="Spans dropped because the export queue was full",
+)
+dropped_events = meter.create_counter(
+    "tracing.span_events.dropped",
+    unit="{event}",
+    description="Span events stripped to relieve the export queue",
+)
+
+
+class CountingSpanExporter(SpanExporter):
+    """
+    Exporter wrapper counting exported spans by result.
+    """
+
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        result = self.exporter.export(spans)
+        exported_spans.add(len(spans), {"result": result.name.lower()})
+        return result
+
+    def shutdown(self):
+        self.exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.exporter.force_flush(timeout_millis)
+
+
+def strip_events(span: ReadableSpan) -> ReadableSpan:
+    return ReadableSpan(
+        name=span.name,
+        context=span.context,
+        parent=span.parent,
+        resource=span.resource,
+        attributes={**span.attributes, DROPPED_EVENTS: len(span.events)},
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+class SheddingSpanProcessor(BatchSpanProcessor):
+    """
+    Batch processor that sheds load in two steps when the exporter backs up.
+
+    Once the queue is `shed_ratio` full, spans are queued without their
+    events, which hold the request/response bodies and log records and are
+    by far the largest part of a span. When the queue is full, new spans are
+    dropped and counted, where `BatchSpanProcessor` would silently evict the
+    oldest ones.
+    """
+
+    def __init__(
+        self,
+        span_exporter: SpanExporter,
+        max_queue_size: int = 2048,
+        shed_ratio: float = 0.75,
+        **kwargs,
+    ):
+        super().__init__(span_exporter, max_queue_size=max_queue_size, **kwargs)
+        self.max_queue_size = max_queue_size
+        self.shed_size = int(max_queue_size * shed_ratio)
+        if self.get_queue_size() is None:
+            logger.warning("Span export queue not found, load shedding is disabled")
+
+    def get_queue_size(self) -> Optional[int]:
+        # The queue is internal to the SDK, it may be gone after an upgrade.
+        queue = getattr(getattr(self, "_batch_processor", None), "_queue", None)
+        return None if queue is None else len(queue)
+
+    def on_end(self, span: ReadableSpan):
+        if not span.context.trace_flags.sampled:
+            return
+        size = self.get_queue_size()
+        if size is None:
+            super().on_end(span)
+            return
+        if size >= self.max_queue_size:
+            dropped_spans.add(1)
+            return
+        if size >= self.shed_size and span.events:
+            dropped_events.add(len(span.events))
+            span = strip_events(span)
+        super().on_end(span)
+
+
+def get_span_processor(endpoint: str, config: dict) -> SheddingSpanProcessor:
+    exporter = OTLPSpanExporter(
+        endpoint=endpoint,
+        timeout=config["EXPORT_TIMEOUT_MILLIS"] / 1000,
+        compression=COMPRESSIONS[config["COMPRESSION"]],
+    )
+    return SheddingSpanProcessor(
+        CountingSpanExporter(exporter),
+        max_queue_size=config["MAX_QUEUE_SIZE"],
+        shed_ratio=config["SHED_RATIO"],
+        max_export_batch_size=config["MAX_EXPORT_BATCH_SIZE"],
+        schedule_delay_millis=config["SCHEDULE_DELAY_MILLIS"],
+        export_timeout_millis=config["EXPORT_TIMEOUT_MILLIS"],
+    )
+
+
+def get_meter_provider(
+    endpoint: str, config: dict, resource: Resource
+) -> MeterProvider:
+    from configurations.metrics import QUERY_BUCKETS
+
+    exporter = OTLPMetricExporter(
+        endpoint=endpoint,
+        timeout=config["EXPORT_TIMEOUT_MILLIS"] / 1000,
+        compression=COMPRESSIONS[config["COMPRESSION"]],
+    )
+    reader = PeriodicExportingMetricReader(
+        exporter,
+        export_interval_millis=config["INTERVAL_MILLIS"],
+        export_timeout_millis=config["EXPORT_TIMEOUT_MILLIS"],
+    )
+    return MeterProvider(
+        resource=resource,
+        metric_readers=[reader],
+        views=[
+            View(
+                instrument_name="db.client.request.queries",
+                aggregation=ExplicitBucketHistogramAggregation(QUERY_BUCKETS),
+            ),
+        ],
+    )
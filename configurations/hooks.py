@@ -1,15 +1,22 @@
 import json
 from logging import LogRecord
+from typing import Callable, Optional, Union
+from urllib.parse import parse_qsl
 
 from django.conf import settings
 from django.core.handlers.wsgi import WSGIRequest
-from opentelemetry.sdk.trace import Span
+from opentelemetry.trace import Span
 from opentelemetry.trace.status import StatusCode
 from requests import Response
 
+from configurations.events import EventQueue
+from configurations.logging import encode_redacted
+
 MIN_LENGTH = 2
 MAX_LENGHT = 6500
 
+event_queue = EventQueue(settings.TRACING_EVENT_QUEUE["MAX_SIZE"])
+
 
 def add_event(span: Span, attributes: dict = {}, message: str = "log"):
     if not attributes:
@@ -17,25 +24,70 @@ def add_event(span: Span, attributes: dict = {}, message: str = "log"):
     span.add_event(name=message, attributes=attributes)
 
 
+def encode_body(
+    body: Union[bytes, str, None], content_type: str = "", max_bytes: int = MAX_LENGHT
+) -> Optional[bytes]:
+    """
+    Encode a raw HTTP body for a span attribute.
+
+    JSON and form bodies are parsed once and re-encoded with sensitive fields
+    masked, up to `max_bytes`. Other bodies are only kept when they fit.
+    """
+    if not body or len(body) <= MIN_LENGTH:
+        return None
+    if "json" in content_type:
+        try:
+            return encode_redacted(json.loads(body), max_bytes, size_hint=len(body))
+        except ValueError:
+            pass
+    elif content_type.startswith("application/x-www-form-urlencoded"):
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        return encode_redacted(dict(parse_qsl(body)), max_bytes, size_hint=len(body))
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return body if len(body) < max_bytes else None
+
+
+def submit_event(span: Span, build: Callable, *args, message: str = "log"):
+    """
+    Build an event from `args` and attach it to `span`, on the background
+    event queue when `TRACING_EVENT_QUEUE` is enabled.
+    """
+    if settings.TRACING_EVENT_QUEUE["ENABLED"]:
+        event_queue.put(span, message, build, *args)
+    else:
+        add_event(span, attributes=build(*args), message=message)
+
+
+def build_request_attributes(request: WSGIRequest) -> dict:
+    attributes = {}
+    params = getattr(request, "GET", None)
+    if params:
+        attributes["requests.queryparams"] = encode_redacted(
+            params.dict() if hasattr(params, "dict") else params, MAX_LENGHT
+        )
+    headers = getattr(request, "headers", None) or {}
+    body = encode_body(getattr(request, "body", None), headers.get("Content-Type", ""))
+    if body:
+        attributes["requests.body"] = body
+    return attributes
+
+
+def build_response_attributes(response: Response) -> dict:
+    content = getattr(response, "content", None)
+    if content and isinstance(content, bytes):
+        headers = getattr(response, "headers", None) or {}
+        body = encode_body(content, headers.get("Content-Type", ""))
+        if body:
+            return {"response.body": body}
+    return {}
+
+
 def request_hook(span: Span, request: WSGIRequest):
     if span and span.is_recording():
-        attributes = {}
         try:
-            params = (
-                json.dumps(
-                    getattr(request, "GET", None),
-                    indent=2,
-                ).encode("utf-8")
-                if getattr(request, "GET", None)
-                else None
-            )
-            body = getattr(request, "body", None)
-            if bool(params) and MIN_LENGTH < len(params) < MAX_LENGHT:
-                attributes["requests.queryparams"] = params
-            if bool(body) and MIN_LENGTH < len(body) < MAX_LENGHT:
-                attributes["requests.body"] = body
-            if bool(attributes):
-                add_event(span, attributes=attributes)
+            submit_event(span, build_request_attributes, request)
         except Exception as e:
             print(str(e))
 
@@ -43,13 +95,9 @@ def request_hook(span: Span, request: WSGIRequest):
 def response_hook(span: Span, request: WSGIRequest, response: Response):
     if span and span.is_recording():
         try:
-            content = getattr(response, "content", None)
-            if (
-                content
-                and isinstance(content, bytes)
-                and MIN_LENGTH < len(content) < MAX_LENGHT
-            ):
-                add_event(span, attributes={"response.body": content})
+            # The span ends as soon as this hook returns, so a queued event
+            # would always arrive late. The body is attached right away.
+            add_event(span, attributes=build_response_attributes(response))
 
             status = getattr(response, "status_code", None)
             if status is not None:
@@ -83,7 +131,7 @@ def django_response_hook(span: Span, request: WSGIRequest, response: Response):
 def get_formatted_message(record: LogRecord) -> str:
     """Helper function để format message"""
     if isinstance(record.msg, dict):
-        return json.dumps(record.msg, indent=2, ensure_ascii=False)
+        return encode_redacted(record.msg, MAX_LENGHT).decode("utf-8")
     elif isinstance(record.msg, bytes):
         return record.msg.decode("utf-8", errors="replace")
     else:
@@ -93,31 +141,31 @@ def get_formatted_message(record: LogRecord) -> str:
             return str(record.msg % record.args)
 
 
+def build_log_attributes(record: LogRecord) -> dict:
+    attributes = {
+        "log.severity": record.levelname,
+        "log.message": get_formatted_message(record),
+        "code.lineno": record.lineno,
+        "code.funcname": record.funcName,
+        "code.filename": record.filename,
+        "module": record.module,
+        "log.logger": record.name,
+        "timestamp": record.created,
+    }
+    if str(settings.BASE_DIR) in record.pathname:
+        attributes["filepath"] = record.pathname.replace(str(settings.BASE_DIR), "")
+    # if record.exc_info:
+    #     attributes["exception.type"] = record.exc_info[0].__name__
+    #     attributes["exception.message"] = str(record.exc_info[1])
+    return attributes
+
+
 def log_hook(span: Span, record: LogRecord):
     try:
         if span and span.is_recording():
             if record.levelname in ["ERROR", "CRITICAL"]:
                 span.set_status(StatusCode.ERROR)
 
-            content = get_formatted_message(record)
-
-            attributes = {
-                "log.severity": record.levelname,
-                "log.message": content,
-                "code.lineno": record.lineno,
-                "code.funcname": record.funcName,
-                "code.filename": record.filename,
-                "module": record.module,
-                "log.logger": record.name,
-                "timestamp": record.created,
-            }
-            if str(settings.BASE_DIR) in record.pathname:
-                attributes["filepath"] = record.pathname.replace(
-                    str(settings.BASE_DIR), ""
-                )
-            # if record.exc_info:
-            #     attributes["exception.type"] = record.exc_info[0].__name__
-            #     attributes["exception.message"] = str(record.exc_info[1])
-            add_event(span, attributes=attributes)
+            submit_event(span, build_log_attributes, record)
     except Exception as e:
         print(f"Error in log_hook: {str(e)}")
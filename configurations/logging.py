@@ -1,7 +1,14 @@
-from copy import deepcopy
-from typing import Any
+import json
+import logging
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Iterator, Optional
 
+from opentelemetry import trace
 
+MAX_CACHED_KEYS = 4096
+TRUNCATED_MARKER = "...(truncated)"
 HIDDEN_FIELDS = [
     "password",
     "refresh",
@@ -10,30 +17,158 @@ HIDDEN_FIELDS = [
 ]
 
 
-def _sanitize_recursive(
-    data: dict[str, Any],
-    hidden_fields: list[str] = HIDDEN_FIELDS,
-    mask_value: str = "****",
-    case_sensitive: bool = False,
-    deep_search: bool = True,
-) -> Any:
-    if isinstance(data, dict):
-        for key, value in data.items():
-            # Check if current key should be hidden
-            key_to_check = key.lower() if not case_sensitive else key
-            fields_to_check = [
-                f.lower() if not case_sensitive else f for f in hidden_fields
-            ]
+class Sanitizer:
+    """
+    Masks sensitive fields of JSON-like data for a fixed configuration.
 
-            if key_to_check in fields_to_check:
-                data[key] = mask_value
-            elif deep_search and isinstance(value, (dict, list)):
-                data[key] = _sanitize_recursive(value)
+    The hidden field names are normalized into a frozenset once, so checking
+    a key is a single set lookup. The input is never modified: containers are
+    only copied along the paths that actually contain a hidden field, all
+    other branches are shared with the input.
+    """
+
+    def __init__(
+        self,
+        hidden_fields: list[str] = HIDDEN_FIELDS,
+        mask_value: str = "****",
+        case_sensitive: bool = False,
+        deep_search: bool = True,
+    ):
+        self.hidden_fields = frozenset(
+            field if case_sensitive else field.lower() for field in hidden_fields
+        )
+        self.mask_value = mask_value
+        self.case_sensitive = case_sensitive
+        self.deep_search = deep_search
+        self._encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+        self._keys = {}
+
+    def is_hidden(self, key: Any) -> bool:
+        # Payloads repeat the same field names, so decisions are memoized.
+        hidden = self._keys.get(key)
+        if hidden is None:
+            hidden = (
+                isinstance(key, str)
+                and (key if self.case_sensitive else key.lower()) in self.hidden_fields
+            )
+            if len(self._keys) < MAX_CACHED_KEYS:
+                self._keys[key] = hidden
+        return hidden
 
-    elif isinstance(data, list):
-        return [_sanitize_recursive(item) for item in data]
+    def sanitize(self, data: Any) -> Any:
+        if isinstance(data, dict):
+            result = None
+            for key, value in data.items():
+                if self.is_hidden(key):
+                    new_value = self.mask_value
+                elif self.deep_search and isinstance(value, (dict, list, tuple)):
+                    new_value = self.sanitize(value)
+                else:
+                    continue
+                if new_value is not value:
+                    if result is None:
+                        result = dict(data)
+                    result[key] = new_value
+            return data if result is None else result
+
+        if isinstance(data, (list, tuple)):
+            result = None
+            for index, item in enumerate(data):
+                new_item = self.sanitize(item)
+                if new_item is not item:
+                    if result is None:
+                        result = list(data)
+                    result[index] = new_item
+            if result is None:
+                return data
+            return tuple(result) if isinstance(data, tuple) else result
+
+        return data
 
-    return data
+    def iterencode(self, data: Any) -> Iterator[str]:
+        """
+        Encode `data` as JSON chunks, masking hidden fields while writing.
+
+        Nothing is copied and the caller can stop at any chunk, which only
+        pays off for payloads much larger than what is kept of them.
+        """
+        if isinstance(data, dict):
+            yield "{"
+            for index, (key, value) in enumerate(data.items()):
+                if index:
+                    yield ", "
+                yield self._encoder.encode(str(key))
+                yield ": "
+                if self.is_hidden(key):
+                    yield self._encoder.encode(self.mask_value)
+                elif self.deep_search and isinstance(value, (dict, list, tuple)):
+                    yield from self.iterencode(value)
+                else:
+                    yield self._encoder.encode(value)
+            yield "}"
+        elif isinstance(data, (list, tuple)):
+            yield "["
+            for index, item in enumerate(data):
+                if index:
+                    yield ", "
+                yield from self.iterencode(item)
+            yield "]"
+        else:
+            yield self._encoder.encode(data)
+
+    def encode(self, data: Any) -> str:
+        return self._encoder.encode(self.sanitize(data))
+
+    def encode_bytes(
+        self,
+        data: Any,
+        max_bytes: Optional[int] = None,
+        size_hint: Optional[int] = None,
+    ) -> bytes:
+        """
+        Encode `data` as sanitized UTF-8 JSON of at most `max_bytes` bytes.
+
+        The sanitized copy is serialized by the C encoder, the fastest path
+        when the payload fits. When `size_hint`, e.g. the length of the raw
+        body, is already over the budget, the payload is streamed instead and
+        encoding stops at the budget. A truncated result ends with
+        `TRUNCATED_MARKER`.
+        """
+        if max_bytes is not None and size_hint is not None and size_hint > max_bytes:
+            return self.stream_bytes(data, max_bytes)
+
+        encoded = self.encode(data).encode("utf-8")
+        if max_bytes is None or len(encoded) <= max_bytes:
+            return encoded
+        return truncate(encoded, max_bytes)
+
+    def stream_bytes(self, data: Any, max_bytes: int) -> bytes:
+        buffer = bytearray()
+        limit = max(max_bytes - len(TRUNCATED_MARKER), 0)
+        for chunk in self.iterencode(data):
+            encoded = chunk.encode("utf-8")
+            if len(buffer) + len(encoded) > max_bytes:
+                buffer += encoded[: max(limit - len(buffer), 0)]
+                return truncate(bytes(buffer), max_bytes)
+            buffer += encoded
+        return bytes(buffer)
+
+
+def truncate(encoded: bytes, max_bytes: int) -> bytes:
+    limit = max(max_bytes - len(TRUNCATED_MARKER), 0)
+    # Cut on a character boundary so the result stays valid UTF-8.
+    head = encoded[:limit].decode("utf-8", errors="ignore")
+    return (head + TRUNCATED_MARKER).encode("utf-8")
+
+
+@lru_cache(maxsize=32)
+def get_sanitizer(
+    hidden_fields: tuple[str, ...] = tuple(HIDDEN_FIELDS),
+    mask_value: str = "****",
+    case_sensitive: bool = False,
+    deep_search: bool = True,
+) -> Sanitizer:
+    return Sanitizer(hidden_fields, mask_value, case_sensitive, deep_search)
 
 
 def sanitize_data(
@@ -54,18 +189,86 @@ def sanitize_data(
         deep_search: Whether to search nested dictionaries recursively
 
     Returns:
-        Sanitized dictionary with sensitive fields masked
+        Sanitized dictionary with sensitive fields masked. The input is left
+        untouched and unchanged branches are shared with it, so the result
+        must be treated as read-only.
     """
     if not bool(hidden_fields):
         return data
 
-    # Create a deep copy to avoid modifying original data
-    sanitized_data = deepcopy(data)
-
-    return _sanitize_recursive(
-        sanitized_data,
-        hidden_fields,
+    sanitizer = get_sanitizer(
+        tuple(hidden_fields),
         mask_value,
         case_sensitive,
         deep_search,
     )
+    return sanitizer.sanitize(data)
+
+
+def encode_redacted(
+    data: Any,
+    max_bytes: Optional[int] = None,
+    hidden_fields: list[str] = HIDDEN_FIELDS,
+    mask_value: str = "****",
+    size_hint: Optional[int] = None,
+) -> bytes:
+    """
+    Encode data as JSON bytes for span attributes, masking sensitive fields
+    and stopping at `max_bytes`, see `Sanitizer.encode_bytes`.
+    """
+    sanitizer = get_sanitizer(tuple(hidden_fields), mask_value)
+    return sanitizer.encode_bytes(data, max_bytes, size_hint)
+
+
+# Fields added to every structured log record, e.g. the trace of the request
+# that enqueued the Celery task being run.
+log_context: ContextVar[Optional[dict]] = ContextVar("log_context", default=None)
+
+
+def get_trace_ids() -> Optional[tuple[str, str]]:
+    span_context = trace.get_current_span().get_span_context()
+    if not span_context.is_valid:
+        return None
+    return (
+        trace.format_trace_id(span_context.trace_id),
+        trace.format_span_id(span_context.span_id),
+    )
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line with the current trace ids.
+
+    Records are written straight from their attributes, without going through
+    a format string, and the timestamp prefix is only rebuilt once a second.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+        self._second = (None, "")
+
+    def format_time(self, record: logging.LogRecord) -> str:
+        second, prefix = self._second
+        if second != int(record.created):
+            second = int(record.created)
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._second = (second, prefix)
+        return f"{prefix}.{int(record.msecs):03d}Z"
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.format_time(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        context = log_context.get()
+        if context:
+            payload.update(context)
+        trace_ids = get_trace_ids()
+        if trace_ids:
+            payload["trace_id"], payload["span_id"] = trace_ids
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return self._encoder.encode(payload)
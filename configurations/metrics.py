@@ -0,0 +1,65 @@
+from opentelemetry import metrics
+
+# Instruments are created against the global API, they are no-ops until
+# init_telemetry installs a MeterProvider and then start recording.
+meter = metrics.get_meter("configurations")
+
+request_duration = meter.create_histogram(
+    "http.server.view.duration",
+    unit="ms",
+    description="Duration of requests per view",
+)
+db_queries = meter.create_histogram(
+    "db.client.request.queries",
+    unit="{query}",
+    description="Database queries executed per request",
+)
+db_duration = meter.create_histogram(
+    "db.client.request.duration",
+    unit="ms",
+    description="Time spent in database queries per request",
+)
+task_duration = meter.create_histogram(
+    "celery.task.duration",
+    unit="ms",
+    description="Runtime of Celery tasks",
+)
+task_queue_wait = meter.create_histogram(
+    "celery.task.queue_wait",
+    unit="ms",
+    description="Time between publishing a Celery task and a worker starting it",
+)
+redis_calls = meter.create_counter(
+    "redis.calls",
+    unit="{call}",
+    description="Round trips to Redis, by operation",
+)
+blacklist_checks = meter.create_counter(
+    "jwt.blacklist.checks",
+    unit="{check}",
+    description="Refresh token blacklist checks, by where they were answered",
+)
+constance_reads = meter.create_counter(
+    "constance.reads",
+    unit="{key}",
+    description="Constance keys read, by local cache result",
+)
+span_event_queue = meter.create_counter(
+    "tracing.span_event_queue.events",
+    unit="{event}",
+    description="Span events of the background event queue, by result",
+)
+cleanup_deleted = meter.create_counter(
+    "db.cleanup.deleted",
+    unit="{row}",
+    description="Rows deleted by periodic cleanup tasks, by table",
+)
+cleanup_duration = meter.create_histogram(
+    "db.cleanup.duration",
+    unit="ms",
+    description="Runtime of periodic cleanup tasks, by table",
+)
+
+# Query counts are small integers, the default millisecond oriented buckets
+# would put almost every request in the first two.
+QUERY_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50, 100, 200]
@@ -1,15 +1,62 @@
 import json
 import logging
+import os
+import random
+import time
+from typing import Optional
 
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from opentelemetry import trace
 
-from configurations.hooks import add_event
-
-from configurations.logging import sanitize_data
+from configurations.hooks import MAX_LENGHT, add_event
+from configurations.logging import encode_redacted
+from configurations.metrics import db_duration, db_queries, request_duration
+from configurations.queries import QueryBudgetExceeded, QueryCounter
+from configurations.timing import timings
+from core.common.activity import record_activity
+from core.common.enums import ActivityTypeEnum
 
 logger = logging.getLogger(__name__)
 
 
+class CapturePolicy:
+    """
+    Decide whether and how much of a request/response body to capture.
+
+    `ROUTES` maps path prefixes to overrides of the `DEFAULT` rule, the
+    longest matching prefix wins. Rules support:
+    - sample_rate: fraction of requests whose bodies are captured
+    - max_bytes: budget of the encoded body attached to the span
+    - max_body_bytes: request bodies larger than this are not read at all,
+      multipart bodies never are
+    """
+
+    def __init__(self, config: dict):
+        self.default = config.get("DEFAULT", {})
+        self.routes = sorted(
+            (
+                (prefix, {**self.default, **rule})
+                for prefix, rule in config.get("ROUTES", {}).items()
+            ),
+            key=lambda route: len(route[0]),
+            reverse=True,
+        )
+
+    def get_rule(self, path: str) -> dict:
+        for prefix, rule in self.routes:
+            if path.startswith(prefix):
+                return rule
+        return self.default
+
+    def sample(self, path: str) -> Optional[dict]:
+        rule = self.get_rule(path)
+        if random.random() < rule.get("sample_rate", 1.0):
+            return rule
+        return None
+
+
 class TracingMiddleware:
     """
     Middleware to log POST data for debugging purposes.
@@ -18,26 +65,211 @@ class TracingMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
         self.tracer = trace.get_tracer(__name__)
+        self.policy = CapturePolicy(settings.TRACING_CAPTURE)
+
+    def capture_request(self, span, request, rule: dict):
+        max_bytes = rule.get("max_bytes", MAX_LENGHT)
+        if request.method in ["POST", "PUT", "PATCH"]:
+            # Decide from the headers, reading request.body loads it in memory.
+            size = int(request.META.get("CONTENT_LENGTH") or 0)
+            content_type = getattr(request, "content_type", "")
+            too_large = size > rule.get("max_body_bytes", 64 * 1024)
+            if too_large or content_type.startswith("multipart/"):
+                add_event(span, {"request.body.size": size}, message="request")
+                return
+            if content_type.startswith("application/json"):
+                body = json.loads(request.body)
+            else:
+                body = request.POST.dict()
+            add_event(
+                span,
+                {
+                    "request.body": encode_redacted(body, max_bytes, size_hint=size),
+                    "request.body.size": size,
+                },
+                message="request",
+            )
+        elif request.method == "GET" and hasattr(request, "GET") and request.GET:
+            add_event(
+                span,
+                {"request.query": encode_redacted(request.GET.dict(), max_bytes)},
+                message="request",
+            )
+
+    def capture_response(self, span, response, rule: dict):
+        response_data = getattr(response, "data", None)
+        if response_data:
+            size = None
+            if not response.streaming and getattr(response, "is_rendered", True):
+                size = len(response.content)
+            body = encode_redacted(
+                response_data, rule.get("max_bytes", MAX_LENGHT), size_hint=size
+            )
+            add_event(span, {"response.body": body}, message="response")
 
     def __call__(self, request):
+        span = trace.get_current_span()
+        rule = None
         try:
-            span = trace.get_current_span()
-            if request.method in ["POST", "PUT", "PATCH"]:
-                if getattr(request, "content_type", "").startswith("application/json"):
-                    body = json.loads(request.body.decode("utf-8"))
-                    body = sanitize_data(body)
-                else:
-                    body = sanitize_data(request.POST)
-                add_event(span, json.dumps(body))
-            elif request.method == "GET" and hasattr(request, "GET") and request.GET:
-                add_event(span, json.dumps(request.GET))
-            response = self.get_response(request)
-            response_data = getattr(response, "data", None)
-            if response_data:
-                add_event(span, json.dumps(sanitize_data(response_data)))
-            trace_id_dec = span.get_span_context().trace_id
-            response["X-Trace-ID"] = hex(trace_id_dec).replace("0x", "")
-            return response
+            if span.is_recording():
+                rule = self.policy.sample(request.path_info)
+            if rule is not None:
+                self.capture_request(span, request, rule)
+        except Exception as e:
+            logger.exception(e)
+
+        # Tracing failures must never re-dispatch the request.
+        response = self.get_response(request)
+
+        try:
+            if rule is not None:
+                self.capture_response(span, response, rule)
+            span_context = span.get_span_context()
+            if span_context.is_valid:
+                response["X-Trace-ID"] = format(span_context.trace_id, "032x")
         except Exception as e:
             logger.exception(e)
-        return self.get_response(request)
+        return response
+
+
+class ActivityMiddleware:
+    """
+    Middleware to count API calls per day for the admin activity tracker.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.path_info.startswith("/api/"):
+            record_activity(ActivityTypeEnum.API_CALLS)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Middleware to record request duration and database usage per view.
+
+    Only installed when telemetry is enabled, since the metrics would not be
+    exported anywhere otherwise.
+    """
+
+    def __init__(self, get_response):
+        if not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = getattr(request, "query_counter", None)
+        start = time.perf_counter()
+        if counter is None:
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        attributes = {
+            "http.route": (match.view_name or match.route) if match else "",
+            "http.request.method": request.method,
+            "http.response.status_code": response.status_code,
+        }
+        request_duration.record(duration * 1000, attributes)
+        db_queries.record(counter.count, attributes)
+        db_duration.record(counter.duration * 1000, attributes)
+        return response
+
+
+def add_server_timing(response, metric: str):
+    timing = response.get("Server-Timing")
+    response["Server-Timing"] = f"{timing}, {metric}" if timing else metric
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware to count the queries of every request and enforce budgets.
+
+    Counts and time are attached to the current span and, unless disabled
+    with `SERVER_TIMING`, sent back in a `Server-Timing` header. Exceeding the view's budget in `QUERY_BUDGET`,
+    or repeating a statement `N_PLUS_ONE_THRESHOLD` times, is logged, or
+    raises `QueryBudgetExceeded` when `RAISE` is set (e.g. in tests).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_counter = counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+
+        config = settings.QUERY_BUDGET
+        match = request.resolver_match
+        view = match.view_name if match else ""
+        problems = counter.check(
+            config["VIEWS"].get(view, config["DEFAULT"]),
+            config["N_PLUS_ONE_THRESHOLD"],
+        )
+
+        duration_ms = counter.duration * 1000
+        if settings.SERVER_TIMING:
+            add_server_timing(
+                response, f'db;dur={duration_ms:.1f};desc="{counter.count} queries"'
+            )
+        span = trace.get_current_span()
+        if span.is_recording():
+            span.set_attributes(
+                {
+                    "db.query_count": counter.count,
+                    "db.query_duration_ms": duration_ms,
+                }
+            )
+            if problems:
+                span.add_event("query_budget", {"problems": problems})
+
+        if problems:
+            if config["RAISE"]:
+                raise QueryBudgetExceeded(f"{view}: " + "\n".join(problems))
+            logger.warning(f"Query budget of {view} exceeded: {'; '.join(problems)}")
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware to report the phases timed with `configurations.timing`.
+
+    Every phase is sent back in the `Server-Timing` header and attached to
+    the current span. When disabled with `SERVER_TIMING` the middleware is
+    not installed and the timing calls are no-ops.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        phases = {}
+        token = timings.set(phases)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings.reset(token)
+        duration = time.perf_counter() - start
+
+        metrics = [f"app;dur={duration * 1000:.1f}"]
+        attributes = {}
+        for name, (total, count) in phases.items():
+            metrics.append(f'{name};dur={total * 1000:.1f};desc="{count}x"')
+            attributes[f"timing.{name}.duration_ms"] = total * 1000
+            attributes[f"timing.{name}.count"] = count
+        add_server_timing(response, ", ".join(metrics))
+
+        span = trace.get_current_span()
+        if attributes and span.is_recording():
+            span.set_attributes(attributes)
+        return response
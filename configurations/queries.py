@@ -0,0 +1,79 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting queries and the time spent in them.
+
+    Statements are counted by their SQL with placeholders, so the same query
+    run for every row of a loop (an N+1 pattern) shows up as one statement
+    repeated many times.
+
+    Usage:
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            ...
+        counter.count, counter.duration
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        return {sql: n for sql, n in self.statements.items() if n >= threshold}
+
+    def check(
+        self, budget: Optional[int] = None, threshold: Optional[int] = None
+    ) -> list[str]:
+        """
+        Returns a description of every violation, empty if within budget.
+        """
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"{self.count} queries exceed the budget of {budget}")
+        if threshold:
+            for sql, n in self.repeated(threshold).items():
+                problems.append(f"repeated {n} times: {sql}")
+        return problems
+
+
+@contextmanager
+def query_budget(
+    max_queries: Optional[int] = None,
+    n_plus_one: Optional[int] = 5,
+    using: str = DEFAULT_DB_ALIAS,
+):
+    """
+    Fail with `QueryBudgetExceeded` when the block runs more than
+    `max_queries` queries, or the same statement `n_plus_one` times.
+
+    Usage:
+        with query_budget(3):
+            self.client.post("/api/auth/register/", data)
+    """
+    counter = QueryCounter()
+    with connections[using].execute_wrapper(counter):
+        yield counter
+    problems = counter.check(max_queries, n_plus_one)
+    if problems:
+        raise QueryBudgetExceeded("\n".join(problems))
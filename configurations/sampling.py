@@ -0,0 +1,245 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Sequence
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import (
+    Link,
+    SpanContext,
+    SpanKind,
+    StatusCode,
+    TraceFlags,
+    TraceState,
+    get_current_span,
+)
+from opentelemetry.util.types import Attributes
+
+TAIL_CANDIDATE = "sampling.tail"
+TAIL_LATENCY = "sampling.tail.latency_ms"
+# Trace state entry marking the spans of a tail candidate trace
+TAIL_STATE_KEY = "tail"
+
+
+class RouteSampler(Sampler):
+    """
+    Root sampler with a trace id ratio per route.
+
+    `ROUTES` maps path prefixes to overrides of the `DEFAULT` rule, the
+    longest matching prefix wins. Rules support:
+    - ratio: fraction of traces that are sampled
+    - methods: only apply the rule to these HTTP methods
+    - tail: record the traces that lost the ratio as tail candidates, so
+      `TailSamplingSpanProcessor` can still keep them if they are slow or fail
+    - latency_ms: duration above which a tail candidate is kept
+
+    Tail candidates are recorded without the sampled flag, so the trace
+    context propagated to other services and Celery tasks still reports them
+    as not sampled, and downstream spans of a candidate that is kept later
+    are missing from the trace.
+    """
+
+    def __init__(self, config: dict):
+        self.default = self.compile(config.get("DEFAULT", {}))
+        self.routes = sorted(
+            (
+                (prefix, self.compile({**config.get("DEFAULT", {}), **rule}))
+                for prefix, rule in config.get("ROUTES", {}).items()
+            ),
+            key=lambda route: len(route[0]),
+            reverse=True,
+        )
+
+    @staticmethod
+    def compile(rule: dict) -> dict:
+        return {
+            **rule,
+            "methods": {method.upper() for method in rule.get("methods", ())},
+            "sampler": TraceIdRatioBased(rule.get("ratio", 1.0)),
+        }
+
+    def get_rule(self, attributes: Attributes) -> dict:
+        attributes = attributes or {}
+        path = attributes.get("url.path") or attributes.get("http.target")
+        if not path:
+            return self.default
+        path = path.split("?", 1)[0]
+        method = attributes.get("http.request.method") or attributes.get("http.method")
+        for prefix, rule in self.routes:
+            if path.startswith(prefix) and (
+                not rule["methods"] or method in rule["methods"]
+            ):
+                return rule
+        return self.default
+
+    def should_sample(
+        self,
+        parent_context: Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: Optional[SpanKind] = None,
+        attributes: Attributes = None,
+        links: Optional[Sequence[Link]] = None,
+        trace_state=None,
+    ) -> SamplingResult:
+        rule = self.get_rule(attributes)
+        result = rule["sampler"].should_sample(
+            parent_context, trace_id, name, kind, attributes, links, trace_state
+        )
+        if result.decision is Decision.DROP and rule.get("tail"):
+            trace_state = result.trace_state or TraceState()
+            return SamplingResult(
+                Decision.RECORD_ONLY,
+                {
+                    **(attributes or {}),
+                    TAIL_CANDIDATE: True,
+                    TAIL_LATENCY: rule.get("latency_ms", 1000),
+                },
+                trace_state.add(TAIL_STATE_KEY, "1"),
+            )
+        return result
+
+    def get_description(self) -> str:
+        return f"RouteSampler{{{self.default['sampler'].get_description()}}}"
+
+
+class TailCandidateSampler(Sampler):
+    """
+    Sampler of the local children of unsampled spans.
+
+    Children of a tail candidate are recorded too, so the whole trace can be
+    kept, the others are dropped.
+    """
+
+    def should_sample(
+        self,
+        parent_context: Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: Optional[SpanKind] = None,
+        attributes: Attributes = None,
+        links: Optional[Sequence[Link]] = None,
+        trace_state=None,
+    ) -> SamplingResult:
+        parent_trace_state = (
+            get_current_span(parent_context).get_span_context().trace_state
+        )
+        if TAIL_STATE_KEY in parent_trace_state:
+            return SamplingResult(Decision.RECORD_ONLY, attributes, parent_trace_state)
+        return SamplingResult(Decision.DROP, None, parent_trace_state)
+
+    def get_description(self) -> str:
+        return "TailCandidateSampler"
+
+
+def mark_sampled(span: ReadableSpan) -> ReadableSpan:
+    context = span.context
+    return ReadableSpan(
+        name=span.name,
+        context=SpanContext(
+            context.trace_id,
+            context.span_id,
+            context.is_remote,
+            TraceFlags(TraceFlags.SAMPLED),
+            context.trace_state,
+        ),
+        parent=span.parent,
+        resource=span.resource,
+        attributes=span.attributes,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """
+    Buffer the spans of tail candidate traces until their root span ends.
+
+    A candidate trace is forwarded to `delegate` only if one of its spans
+    failed or the root span took longer than its latency threshold, marked
+    as sampled so exporting processors accept it. All other spans are
+    forwarded right away. At most `max_traces` candidates
+    are buffered, the oldest one is dropped when a new one starts.
+    """
+
+    def __init__(self, delegate: SpanProcessor, max_traces: int = 1000):
+        self.delegate = delegate
+        self.max_traces = max_traces
+        self.counters = {"kept": 0, "dropped": 0, "evicted": 0}
+        self._traces = OrderedDict()
+        self._decisions = OrderedDict()
+        self._lock = Lock()
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None):
+        if span.attributes.get(TAIL_CANDIDATE):
+            with self._lock:
+                self._traces[span.context.trace_id] = {"spans": [], "error": False}
+                if len(self._traces) > self.max_traces:
+                    evicted, _trace = self._traces.popitem(last=False)
+                    self.decide(evicted, False)
+                    self.counters["evicted"] += 1
+                    self.counters["dropped"] += 1
+        self.delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan):
+        trace_id = span.context.trace_id
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                # Spans that end after their root follow its decision, spans
+                # of candidates nobody decided on are never forwarded.
+                keep = self._decisions.get(trace_id)
+                if keep is None:
+                    keep = span.context.trace_flags.sampled
+                if not keep:
+                    return
+                spans = [span]
+            else:
+                trace["spans"].append(span)
+                if span.status.status_code is StatusCode.ERROR:
+                    trace["error"] = True
+                if not span.attributes.get(TAIL_CANDIDATE):
+                    return
+                del self._traces[trace_id]
+                duration_ms = (span.end_time - span.start_time) / 1_000_000
+                keep = trace["error"] or duration_ms >= span.attributes[TAIL_LATENCY]
+                self.decide(trace_id, keep)
+                if not keep:
+                    self.counters["dropped"] += 1
+                    return
+                self.counters["kept"] += 1
+                spans = trace["spans"]
+        for item in spans:
+            if not item.context.trace_flags.sampled:
+                item = mark_sampled(item)
+            self.delegate.on_end(item)
+
+    def decide(self, trace_id: int, keep: bool):
+        self._decisions[trace_id] = keep
+        if len(self._decisions) > self.max_traces:
+            self._decisions.popitem(last=False)
+
+    def shutdown(self):
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
+
+
+def get_sampler(config: dict) -> Sampler:
+    return ParentBased(
+        root=RouteSampler(config),
+        local_parent_not_sampled=TailCandidateSampler(),
+    )
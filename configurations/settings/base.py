@@ -96,6 +96,8 @@ LOCAL_APPS = [
 INSTALLED_APPS = UNFOLD_APPS + DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    "configurations.middleware.QueryBudgetMiddleware",
+    "configurations.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -107,8 +109,28 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "configurations.middleware.TracingMiddleware",
+    "configurations.middleware.ServerTimingMiddleware",
+    "configurations.middleware.ActivityMiddleware",
 ]
 
+# Queries per request, see configurations.middleware.QueryBudgetMiddleware
+# VIEWS maps URL names to budgets, DEFAULT applies to the others (None: no budget)
+# RAISE fails the request instead of logging, the tests turn it on
+QUERY_BUDGET = {
+    "DEFAULT": env.int("QUERY_BUDGET_DEFAULT", default=None),
+    "VIEWS": {
+        "register": 6,
+        "send_otp": 4,
+        "verify_otp": 5,
+        "admin_site:admin_password_reset": 3,
+    },
+    "N_PLUS_ONE_THRESHOLD": env.int("QUERY_BUDGET_N_PLUS_ONE_THRESHOLD", default=5),
+    "RAISE": env.bool("QUERY_BUDGET_RAISE", default=False),
+}
+
+# Report phases timed with configurations.timing in the Server-Timing header
+SERVER_TIMING = env.bool("SERVER_TIMING", default=True)
+
 ROOT_URLCONF = "configurations.urls"
 
 TEMPLATES = [
@@ -138,6 +160,20 @@ DATABASES = {"default": env.db()}
 
 CACHES = {"default": env.cache()}
 
+REDIS_URL = env.str("CACHE_URL")
+
+# Seconds before a raw Redis command gives up, so an outage fails the calls
+# fast instead of holding requests until the kernel times the socket out
+REDIS_CONNECT_TIMEOUT = env.float("REDIS_CONNECT_TIMEOUT", default=0.5)
+REDIS_SOCKET_TIMEOUT = env.float("REDIS_SOCKET_TIMEOUT", default=0.5)
+
+# Storage engine of the active OTP codes, see core.user.otp
+OTP_STORE = {
+    "BACKEND": env.str("OTP_STORE_BACKEND", default="core.user.otp.DatabaseOtpStore"),
+    # Record the codes of RedisOtpStore as OtpCode rows from a Celery task
+    "AUDIT": env.bool("OTP_STORE_AUDIT", default=True),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
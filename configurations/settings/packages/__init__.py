@@ -3,4 +3,5 @@ from configurations.settings.packages.constance import *  # noqa
 from configurations.settings.packages.djmoney import *  # noqa
 from configurations.settings.packages.drf import *  # noqa
 from configurations.settings.packages.modeltranslation import *  # noqa
+from configurations.settings.packages.telemetry import *  # noqa
 from configurations.settings.packages.unfold import *  # noqa
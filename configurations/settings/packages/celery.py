@@ -1,3 +1,5 @@
+from celery.schedules import crontab
+
 from configurations.settings.base import TIME_ZONE, env
 
 # Celery
@@ -11,3 +13,34 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_TASK_SOFT_TIME_LIMIT = 20 * 60
+
+# Celery beat
+# https://docs.celeryq.dev/en/stable/userguide/periodic-tasks.html
+DASHBOARD_SNAPSHOT_INTERVAL = env.int("DASHBOARD_SNAPSHOT_INTERVAL", default=5 * 60)
+DASHBOARD_SNAPSHOT_TIMEOUT = 3 * DASHBOARD_SNAPSHOT_INTERVAL
+
+# Chunked deletes of expired rows, run off peak
+CLEANUP = {
+    "BATCH_SIZE": env.int("CLEANUP_BATCH_SIZE", default=1000),
+    "PAUSE_SECONDS": env.float("CLEANUP_PAUSE_SECONDS", default=0.1),
+    "MAX_SECONDS": env.int("CLEANUP_MAX_SECONDS", default=10 * 60),
+}
+
+CELERY_BEAT_SCHEDULE = {
+    "refresh_dashboard_snapshot": {
+        "task": "refresh_dashboard_snapshot",
+        "schedule": DASHBOARD_SNAPSHOT_INTERVAL,
+    },
+    "refresh_cohort_retention": {
+        "task": "refresh_cohort_retention",
+        "schedule": crontab(hour=0, minute=10),
+    },
+    "purge_otp_codes": {
+        "task": "purge_otp_codes",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "purge_expired_tokens": {
+        "task": "purge_expired_tokens",
+        "schedule": crontab(hour=3, minute=30),
+    },
+}
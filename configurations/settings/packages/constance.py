@@ -14,8 +14,10 @@ from configurations.settings.packages.unfold.color import (
 
 CONSTANCE_SUPERUSER_ONLY = True
 
-CONSTANCE_BACKEND = "constance.backends.redisd.RedisBackend"
+CONSTANCE_BACKEND = "core.common.constance.LocalCachedRedisBackend"
 CONSTANCE_REDIS_CONNECTION = env.str("CACHE_URL")
+CONSTANCE_LOCAL_CACHE_TIMEOUT = env.int("CONSTANCE_LOCAL_CACHE_TIMEOUT", default=60)
+CONSTANCE_LOCAL_CACHE_MAX_SIZE = env.int("CONSTANCE_LOCAL_CACHE_MAX_SIZE", default=256)
 
 CONSTANCE_DEFAULT_VALUE = "-"
 
@@ -35,6 +37,13 @@ CONSTANCE_CONFIG = {
     "SITE_ICON__DARK": [CONSTANCE_DEFAULT_VALUE, _("Website icon for dark mode")],
     "THEME": [CONSTANCE_DEFAULT_VALUE, _("Website theme"), "theme_choice_field"],
     "OTP_CODE_EXPIRATION_TIME": [10, _("Expiration time in minutes")],
+    "OTP_CODE_RETENTION_DAYS": [
+        28,
+        _(
+            "Days to keep OTP codes after they expire before deleting them,"
+            " at least the 28 days shown on the dashboard"
+        ),
+    ],
     "COLORS__BASE": [
         get_default_color_value(UNFOLD_BASE),
         _("Base colors"),
@@ -55,7 +64,10 @@ CONSTANCE_CONFIG = {
 CONSTANCE_CONFIG_FIELDSETS = OrderedDict(
     {
         "Service": {
-            "fields": ("OTP_CODE_EXPIRATION_TIME",),
+            "fields": (
+                "OTP_CODE_EXPIRATION_TIME",
+                "OTP_CODE_RETENTION_DAYS",
+            ),
             "collapse": False,
         },
         "General Settings": {
@@ -50,19 +50,28 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(
         days=env.int("SLIDING_TOKEN_REFRESH_LIFETIME", default=1)
     ),
-    "TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainPairSerializer",
-    "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
+    "TOKEN_OBTAIN_SERIALIZER": "controllers.auth.serializers.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "controllers.auth.serializers.TokenRefreshSerializer",
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
     "SLIDING_TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainSlidingSerializer",
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
 
+# Refresh token blacklist, see core.user.tokens. Without a backend the
+# database blacklist of simplejwt is used.
+TOKEN_BLACKLIST = {
+    "BACKEND": env.str("TOKEN_BLACKLIST_BACKEND", default=None),
+    "BLOOM_CAPACITY": env.int("TOKEN_BLACKLIST_BLOOM_CAPACITY", default=100_000),
+    "BLOOM_ERROR_RATE": 0.01,
+    "SYNC_SECONDS": env.int("TOKEN_BLACKLIST_SYNC_SECONDS", default=60),
+}
+
 # Django REST Framework settings
 # https://www.django-rest-framework.org/api-guide/settings/
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "controllers.auth.authentication.TimedJWTAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_RENDERER_CLASSES": [
@@ -0,0 +1,54 @@
+from configurations.settings.base import env
+
+# Request/response body capture for TracingMiddleware
+# Routes are path prefixes, e.g. {"/api/users/my-profile/": {"sample_rate": 0.01}}
+TRACING_CAPTURE = {
+    "DEFAULT": {
+        "sample_rate": env.float("TRACING_CAPTURE_SAMPLE_RATE", default=1.0),
+        "max_bytes": env.int("TRACING_CAPTURE_MAX_BYTES", default=6500),
+        "max_body_bytes": env.int("TRACING_CAPTURE_MAX_BODY_BYTES", default=64 * 1024),
+    },
+    "ROUTES": {},
+}
+
+# Build span events of configurations.hooks on a background thread
+# Events are dropped when the queue is full or their span has already ended
+TRACING_EVENT_QUEUE = {
+    "ENABLED": env.bool("TRACING_EVENT_QUEUE_ENABLED", default=False),
+    "MAX_SIZE": env.int("TRACING_EVENT_QUEUE_MAX_SIZE", default=10000),
+}
+
+# Head sampling ratio per route, see configurations.sampling.RouteSampler
+# e.g. {"/api/users/my-profile/": {"ratio": 0.01, "methods": ["GET"]},
+#       "/api/auth/login/": {"ratio": 0.0, "tail": True}}
+TRACING_SAMPLING = {
+    "DEFAULT": {
+        "ratio": env.float("TRACING_SAMPLE_RATIO", default=1.0),
+        "tail": env.bool("TRACING_TAIL_SAMPLING", default=False),
+        "latency_ms": env.int("TRACING_TAIL_LATENCY_MS", default=1000),
+    },
+    "ROUTES": {},
+}
+# Tail candidates are recorded unsampled and only exported once kept, they
+# propagate as not sampled so Celery tasks and downstream services drop their
+# part of the trace
+# Tail candidate traces buffered at once, per process
+TRACING_TAIL_MAX_TRACES = env.int("TRACING_TAIL_MAX_TRACES", default=1000)
+
+# Span export, see configurations.exporting.SheddingSpanProcessor
+# Span events are stripped once the queue is SHED_RATIO full
+TRACING_EXPORT = {
+    "MAX_QUEUE_SIZE": env.int("TRACING_EXPORT_MAX_QUEUE_SIZE", default=2048),
+    "MAX_EXPORT_BATCH_SIZE": env.int("TRACING_EXPORT_BATCH_SIZE", default=512),
+    "SCHEDULE_DELAY_MILLIS": env.int("TRACING_EXPORT_DELAY_MILLIS", default=5000),
+    "EXPORT_TIMEOUT_MILLIS": env.int("TRACING_EXPORT_TIMEOUT_MILLIS", default=10000),
+    "COMPRESSION": env.str("TRACING_EXPORT_COMPRESSION", default="gzip"),
+    "SHED_RATIO": env.float("TRACING_EXPORT_SHED_RATIO", default=0.75),
+}
+
+# Metric export, see configurations.metrics for the instruments
+METRICS_EXPORT = {
+    "INTERVAL_MILLIS": env.int("METRICS_EXPORT_INTERVAL_MILLIS", default=60000),
+    "EXPORT_TIMEOUT_MILLIS": env.int("METRICS_EXPORT_TIMEOUT_MILLIS", default=10000),
+    "COMPRESSION": env.str("TRACING_EXPORT_COMPRESSION", default="gzip"),
+}
@@ -1,32 +1,26 @@
 import logging
 import os
 
-from opentelemetry import trace
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from opentelemetry.instrumentation.celery import CeleryInstrumentor
-from opentelemetry.instrumentation.django import DjangoInstrumentor
-from opentelemetry.instrumentation.logging import LoggingInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
-from opentelemetry.sdk.resources import (
-    DEPLOYMENT_ENVIRONMENT,
-    SERVICE_NAME,
-    SERVICE_VERSION,
-    Resource,
-)
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.sdk.trace.sampling import ALWAYS_ON
-
-from configurations.hooks import (
-    django_request_hook,
-    django_response_hook,
-    log_hook,
-    request_hook,
-    response_hook,
-)
-
-
-def init_instrumentation(provider: TracerProvider, is_service: bool = False):
+from django.conf import settings
+
+# The OpenTelemetry SDK, the gRPC exporter and the instrumentors are imported
+# inside the functions below: they account for a large part of the start up
+# time and are not needed at all when no OTLP endpoint is configured.
+
+
+def init_instrumentation(provider, is_service: bool = False):
+    from opentelemetry.instrumentation.celery import CeleryInstrumentor
+    from opentelemetry.instrumentation.logging import LoggingInstrumentor
+    from opentelemetry.instrumentation.requests import RequestsInstrumentor
+
+    from configurations.hooks import (
+        django_request_hook,
+        django_response_hook,
+        log_hook,
+        request_hook,
+        response_hook,
+    )
+
     LoggingInstrumentor().instrument(
         set_logging_format=True,
         log_level=logging.INFO,
@@ -40,6 +34,8 @@ def init_instrumentation(provider: TracerProvider, is_service: bool = False):
     )
     CeleryInstrumentor().instrument(tracer_provider=provider)
     if is_service:
+        from opentelemetry.instrumentation.django import DjangoInstrumentor
+
         DjangoInstrumentor().instrument(
             request_hook=django_request_hook,
             response_hook=django_response_hook,
@@ -48,13 +44,39 @@ def init_instrumentation(provider: TracerProvider, is_service: bool = False):
         )
 
 
-def init_telemetry(is_service: bool = False, **kwargs):
+def has_tail_sampling(config: dict) -> bool:
+    rules = [config.get("DEFAULT", {}), *config.get("ROUTES", {}).values()]
+    return any(rule.get("tail") for rule in rules)
+
+
+def init_telemetry(is_service: bool = False, **kwargs) -> bool:
     """
     Variables:
     - otlp_endpoint: str, endpoint for OTLP exporter
     - is_service: bool, whether this is a service application
     - service_name: str, name of the service (default: "prisvio")
+
+    Returns whether telemetry was initialized, nothing is imported when the
+    OTLP endpoint is not configured.
     """
+    otlp_endpoint = kwargs.get(
+        "otlp_endpoint", os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    )
+    if not (otlp_endpoint and isinstance(otlp_endpoint, str)):
+        return False
+
+    from opentelemetry import metrics, trace
+    from opentelemetry.sdk.resources import (
+        DEPLOYMENT_ENVIRONMENT,
+        SERVICE_NAME,
+        SERVICE_VERSION,
+        Resource,
+    )
+    from opentelemetry.sdk.trace import TracerProvider
+
+    from configurations.exporting import get_meter_provider, get_span_processor
+    from configurations.sampling import TailSamplingSpanProcessor, get_sampler
+
     resource = Resource.create(
         {
             DEPLOYMENT_ENVIRONMENT: os.getenv("DEPLOYMENT_ENVIRONMENT", "production"),
@@ -67,18 +89,19 @@ def init_telemetry(is_service: bool = False, **kwargs):
 
     provider = TracerProvider(
         resource=resource,
-        sampler=ALWAYS_ON,
+        sampler=get_sampler(settings.TRACING_SAMPLING),
     )
 
-    otlp_endpoint = kwargs.get(
-        "otlp_endpoint", os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
-    )
-
-    if otlp_endpoint and isinstance(otlp_endpoint, str):
-        span_processor = BatchSpanProcessor(OTLPSpanExporter(endpoint=otlp_endpoint))
-    else:
-        return
+    span_processor = get_span_processor(otlp_endpoint, settings.TRACING_EXPORT)
+    if has_tail_sampling(settings.TRACING_SAMPLING):
+        span_processor = TailSamplingSpanProcessor(
+            span_processor, max_traces=settings.TRACING_TAIL_MAX_TRACES
+        )
     provider.add_span_processor(span_processor)
     trace.set_tracer_provider(provider)
+    metrics.set_meter_provider(
+        get_meter_provider(otlp_endpoint, settings.METRICS_EXPORT, resource)
+    )
 
     init_instrumentation(provider=provider, is_service=is_service)
+    return True
@@ -0,0 +1,79 @@
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Optional
+
+# Phase name to [total seconds, count] for the current request, None outside
+# of ServerTimingMiddleware so instrumented code does nothing at all.
+timings: ContextVar[Optional[dict]] = ContextVar("timings", default=None)
+
+
+class Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NOOP = Noop()
+
+
+class Phase:
+    __slots__ = ("name", "phases", "start")
+
+    def __init__(self, name: str, phases: dict):
+        self.name = name
+        self.phases = phases
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = perf_counter() - self.start
+        phase = self.phases.get(self.name)
+        if phase is None:
+            self.phases[self.name] = [duration, 1]
+        else:
+            phase[0] += duration
+            phase[1] += 1
+        return False
+
+
+def timed(name: str):
+    """
+    Time a block as the phase `name` of the current request.
+
+    Usage:
+        with timed("template"):
+            html = render_to_string(...)
+
+    Outside of a timed request the shared `NOOP` is returned, so nothing is
+    allocated.
+    """
+    phases = timings.get()
+    if phases is None:
+        return NOOP
+    return Phase(name, phases)
+
+
+def timer(name: str) -> Callable:
+    """
+    Decorator timing every call of the function as the phase `name`.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            phases = timings.get()
+            if phases is None:
+                return func(*args, **kwargs)
+            with Phase(name, phases):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -19,11 +19,13 @@ try:
     from configurations.telemetry import init_telemetry
 
     print(f"Inintializing telemetry for {settings.SERVICE_NAME}...")
-    init_telemetry(
+    if init_telemetry(
         service_name=settings.SERVICE_NAME,
         is_service=True,
-    )
-    print("Telemetry initialized successfully.")
+    ):
+        print("Telemetry initialized successfully.")
+    else:
+        print("Telemetry is disabled, OTEL_EXPORTER_OTLP_ENDPOINT is not set.")
 except ImportError as e:
     print(f"Telemetry initialization failed: {e}")
 
@@ -16,6 +16,7 @@ from unfold.widgets import (
 )
 
 from common.forms import BaseForm
+from configurations.timing import timed
 from core.common.tasks import send_email_task
 from core.user.models import User
 
@@ -42,10 +43,11 @@ class AdminPasswordResetForm(BaseForm):
         """
         Send a django.core.mail.EmailMultiAlternatives to `to_email`.
         """
-        subject = loader.render_to_string(subject_template_name, context)
+        with timed("template"):
+            subject = loader.render_to_string(subject_template_name, context)
+            body = loader.render_to_string(email_template_name, context)
         # Email subject *must not* contain newlines
         subject = "".join(subject.splitlines())
-        body = loader.render_to_string(email_template_name, context)
 
         send_email_task.delay(
             subject=subject,
@@ -1,17 +1,29 @@
 import json
-import random
-from functools import lru_cache
+import math
+from datetime import date
 
 from django.contrib.humanize.templatetags.humanize import intcomma
 from django.urls import reverse_lazy
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 from unfold.components import BaseComponent, register_component
-from django.utils.timezone import now, timedelta
+from django.utils.timezone import localdate, timedelta
+
+from core.common.activity import get_activity
+from core.common.dashboard import COHORT_DAYS, COHORT_ROWS, get_cohorts, get_snapshot
+from core.common.enums import ActivityTypeEnum
+
+
+KPI_TITLES = {
+    "signups": _("New users"),
+    "otp_sent": _("OTP codes sent"),
+    "otp_verified": _("OTP codes verified"),
+    "tokens_issued": _("Tokens issued"),
+}
 
 
 def dashboard_callback(request, context):
-    context.update(random_data(request))
+    context.update(dashboard_data(request))
     return context
 
 
@@ -27,22 +39,28 @@ def navigation_component(request):
     ]
 
 
-@lru_cache
-def cohort_random_data():
+def cohort_data():
+    cohorts = get_cohorts()
+    today = localdate()
+    days = range(COHORT_DAYS)
+    totals = [0 for _day in days]
     rows = []
-    headers = []
-    cols = []
 
-    dates = reversed(
-        [(now() - timedelta(days=x)).strftime("%B %d, %Y") for x in range(8)]
-    )
-    groups = range(1, 10)
-
-    for row_index, date in enumerate(dates):
+    for index in reversed(range(COHORT_ROWS)):
+        cohort = today - timedelta(days=index + 1)
+        cells = cohorts.get(cohort, {})
+        size = cells.get(0, 0)
         cols = []
 
-        for col_index, _col in enumerate(groups):
-            color_index = 8 - row_index - col_index
+        for day in days:
+            value = cells.get(day)
+            if value is None:
+                cols.append({"value": "", "color": None, "subtitle": ""})
+                continue
+
+            totals[day] += value
+            rate = value / size * 100 if size else 0
+            color_index = min(8, math.ceil(rate / 12.5))
             col_classes = []
 
             if color_index > 0:
@@ -56,44 +74,31 @@ def cohort_random_data():
             if color_index >= 6:
                 col_classes.append("dark:text-base-800")
 
-            value = random.randint(
-                10,
-                10000,
-            )
-            subtitle = ""
             cols.append(
                 {
-                    "value": value,
+                    "value": intcomma(value),
                     "color": " ".join(col_classes),
-                    "subtitle": subtitle,
+                    "subtitle": f"{rate:.0f}%",
                 }
             )
 
         rows.append(
             {
                 "header": {
-                    "title": date,
-                    "subtitle": f"Total {sum(col['value'] for col in cols):,}",
+                    "title": cohort.strftime("%B %d, %Y"),
+                    "subtitle": _("%(size)s signups") % {"size": intcomma(size)},
                 },
                 "cols": cols,
             }
         )
 
-    for index, group in enumerate(groups):
-        total = 0
-        for row in rows:
-            total += row["cols"][index]["value"]
-        for row in rows:
-            row["cols"][index][
-                "subtitle"
-            ] = f"{(row['cols'][index]['value'] / total * 100):.0f}%"
-
-        headers.append(
-            {
-                "title": f"Group #{group}",
-                "subtitle": f"Total {total:,}",
-            }
-        )
+    headers = [
+        {
+            "title": _("Day %(day)s") % {"day": day},
+            "subtitle": f"Total {totals[day]:,}",
+        }
+        for day in days
+    ]
 
     return {
         "headers": headers,
@@ -101,24 +106,35 @@ def cohort_random_data():
     }
 
 
-@lru_cache
-def tracker_random_data():
+def tracker_data():
+    activity = get_activity()
+    peak = max(
+        (counters.get(ActivityTypeEnum.API_CALLS, 0) for _day, counters in activity),
+        default=0,
+    )
     data = []
 
-    for _i in range(1, 64):
-        has_value = random.choice([True, True, True, True, False])
+    for day, counters in activity:
+        logins = counters.get(ActivityTypeEnum.LOGINS, 0)
+        api_calls = counters.get(ActivityTypeEnum.API_CALLS, 0)
         color = None
-        tooltip = None
 
-        if has_value:
-            value = random.randint(2, 6)
-            color = "bg-primary-500"
-            tooltip = f"Value {value}"
+        if api_calls or logins:
+            color = "bg-primary-300"
+            if peak and api_calls >= peak / 3:
+                color = "bg-primary-500"
+            if peak and api_calls >= peak * 2 / 3:
+                color = "bg-primary-700"
 
         data.append(
             {
                 "color": color,
-                "tooltip": tooltip,
+                "tooltip": _("%(day)s: %(logins)s logins, %(api_calls)s API calls")
+                % {
+                    "day": day.strftime("%B %d, %Y"),
+                    "logins": intcomma(logins),
+                    "api_calls": intcomma(api_calls),
+                },
             }
         )
 
@@ -129,7 +145,7 @@ def tracker_random_data():
 class CohortComponent(BaseComponent):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["data"] = cohort_random_data()
+        context["data"] = cohort_data()
         return context
 
 
@@ -137,27 +153,48 @@ class CohortComponent(BaseComponent):
 class TrackerComponent(BaseComponent):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["data"] = tracker_random_data()
+        context["data"] = tracker_data()
         return context
 
 
-@lru_cache
-def random_data(request):
-    WEEKDAYS = [
-        "Mon",
-        "Tue",
-        "Wed",
-        "Thu",
-        "Fri",
-        "Sat",
-        "Sun",
-    ]
+def format_change(current: int, previous: int) -> str:
+    if not previous:
+        return _("No data for the previous week")
+    change = (current - previous) / previous * 100
+    color = "text-green-700 dark:text-green-400"
+    if change < 0:
+        color = "text-red-700 dark:text-red-400"
+    return mark_safe(
+        f'<strong class="{color} font-semibold">{change:+.2f}%</strong>'
+        f"&nbsp;{_('compared to last week')}"
+    )
+
+
+def format_rate(part: int, total: int) -> int:
+    return round(part / total * 100) if total else 0
+
+
+def dashboard_data(request):
+    snapshot = get_snapshot()
+    series = snapshot["series"]
+    dates = [date.fromisoformat(value) for value in snapshot["dates"]]
+    labels = [value.strftime("%a") for value in dates]
 
-    positive = [[1, random.randrange(8, 28)] for i in range(1, 28)]
-    negative = [[-1, -random.randrange(8, 28)] for i in range(1, 28)]
-    average = [r[1] - random.randint(3, 5) for r in positive]
-    performance_positive = [[1, random.randrange(8, 28)] for i in range(1, 28)]
-    performance_negative = [[-1, -random.randrange(8, 28)] for i in range(1, 28)]
+    kpi = []
+    for name, title in KPI_TITLES.items():
+        current = sum(series[name][-7:])
+        previous = sum(series[name][-14:-7])
+        kpi.append(
+            {
+                "title": title,
+                "metric": intcomma(current),
+                "footer": format_change(current, previous),
+            }
+        )
+
+    otp_sent = sum(series["otp_sent"])
+    otp_verified = sum(series["otp_verified"])
+    totals = snapshot["totals"]
 
     return {
         "navigation": navigation_component(request),
@@ -168,106 +205,42 @@ def random_data(request):
                 "link": "#",
             },
         ],
-        "kpi": [
-            {
-                "title": "Product A Performance",
-                "metric": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "footer": mark_safe(
-                    f'<strong class="text-green-700 font-semibold dark:text-green-400">+{intcomma(f"{random.uniform(1, 9):.02f}")
-                                                                                         }%</strong>&nbsp;progress from last week'
-                ),
-                "chart": json.dumps(
-                    {
-                        "labels": [WEEKDAYS[day % 7] for day in range(1, 28)],
-                        "datasets": [{"data": average, "borderColor": "#9333ea"}],
-                    }
-                ),
-            },
-            {
-                "title": "Product B Performance",
-                "metric": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "footer": mark_safe(
-                    f'<strong class="text-green-700 font-semibold dark:text-green-400">+{intcomma(f"{random.uniform(1, 9):.02f}")
-                                                                                         }%</strong>&nbsp;progress from last week'
-                ),
-            },
-            {
-                "title": "Product C Performance",
-                "metric": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "footer": mark_safe(
-                    f'<strong class="text-green-700 font-semibold dark:text-green-400">+{intcomma(f"{random.uniform(1, 9):.02f}")
-                                                                                         }%</strong>&nbsp;progress from last week'
-                ),
-            },
-            {
-                "title": "Product C Performance",
-                "metric": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "footer": mark_safe(
-                    f'<strong class="text-green-700 font-semibold dark:text-green-400">+{intcomma(f"{random.uniform(1, 9):.02f}")
-                                                                                         }%</strong>&nbsp;progress from last week'
-                ),
-            },
-        ],
+        "kpi": kpi,
+        "summary": {
+            "metric": intcomma(totals["users"]),
+            "description": _("Registered users, %(verified)s with a verified email.")
+            % {"verified": intcomma(totals["email_verified"])},
+        },
         "progress": [
             {
-                "title": "Social marketing e-book",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Freelancing tasks",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Development coaching",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Product consulting",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
+                "title": _("OTP verification rate"),
+                "description": f"{intcomma(otp_verified)} / {intcomma(otp_sent)}",
+                "value": format_rate(otp_verified, otp_sent),
             },
             {
-                "title": "Other income",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Course sales",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Ads revenue",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Customer Retention Rate",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
+                "title": _("Verified emails"),
+                "description": f"{intcomma(totals['email_verified'])} / {intcomma(totals['users'])}",
+                "value": format_rate(totals["email_verified"], totals["users"]),
             },
         ],
         "chart": json.dumps(
             {
-                "labels": [WEEKDAYS[day % 7] for day in range(1, 28)],
+                "labels": labels,
                 "datasets": [
                     {
-                        "label": "Example 1",
+                        "label": str(_("Signups")),
                         "type": "line",
-                        "data": average,
+                        "data": series["signups"],
                         "borderColor": "var(--color-primary-500)",
                     },
                     {
-                        "label": "Example 2",
-                        "data": positive,
+                        "label": str(_("OTP sent")),
+                        "data": series["otp_sent"],
                         "backgroundColor": "var(--color-primary-700)",
                     },
                     {
-                        "label": "Example 3",
-                        "data": negative,
+                        "label": str(_("Tokens issued")),
+                        "data": series["tokens_issued"],
                         "backgroundColor": "var(--color-primary-300)",
                     },
                 ],
@@ -275,17 +248,17 @@ def random_data(request):
         ),
         "performance": [
             {
-                "title": _("Last week revenue"),
-                "metric": "$1,234.56",
-                "footer": mark_safe(
-                    '<strong class="text-green-600 font-medium">+3.14%</strong>&nbsp;progress from last week'
+                "title": _("Signups in last 28 days"),
+                "metric": intcomma(sum(series["signups"])),
+                "footer": format_change(
+                    sum(series["signups"][-7:]), sum(series["signups"][-14:-7])
                 ),
                 "chart": json.dumps(
                     {
-                        "labels": [WEEKDAYS[day % 7] for day in range(1, 28)],
+                        "labels": labels,
                         "datasets": [
                             {
-                                "data": performance_positive,
+                                "data": series["signups"],
                                 "borderColor": "var(--color-primary-700)",
                             }
                         ],
@@ -293,17 +266,18 @@ def random_data(request):
                 ),
             },
             {
-                "title": _("Last week expenses"),
-                "metric": "$1,234.56",
-                "footer": mark_safe(
-                    '<strong class="text-green-600 font-medium">+3.14%</strong>&nbsp;progress from last week'
+                "title": _("Tokens issued in last 28 days"),
+                "metric": intcomma(sum(series["tokens_issued"])),
+                "footer": format_change(
+                    sum(series["tokens_issued"][-7:]),
+                    sum(series["tokens_issued"][-14:-7]),
                 ),
                 "chart": json.dumps(
                     {
-                        "labels": [WEEKDAYS[day % 7] for day in range(1, 28)],
+                        "labels": labels,
                         "datasets": [
                             {
-                                "data": performance_negative,
+                                "data": series["tokens_issued"],
                                 "borderColor": "var(--color-primary-300)",
                             }
                         ],
@@ -312,15 +286,22 @@ def random_data(request):
             },
         ],
         "table_data": {
-            "headers": [_("Day"), _("Income"), _("Expenses")],
+            "headers": [
+                _("Day"),
+                _("Signups"),
+                _("OTP sent"),
+                _("OTP verified"),
+                _("Tokens issued"),
+            ],
             "rows": [
-                ["22-10-2025", "$2,341.89", "$1,876.45"],
-                ["23-10-2025", "$1,987.23", "$2,109.67"],
-                ["24-10-2025", "$3,456.78", "$1,543.21"],
-                ["25-10-2025", "$1,765.43", "$2,987.65"],
-                ["26-10-2025", "$2,876.54", "$1,234.56"],
-                ["27-10-2025", "$1,543.21", "$2,765.43"],
-                ["28-10-2025", "$3,210.98", "$1,987.65"],
+                [
+                    dates[index].strftime("%d-%m-%Y"),
+                    intcomma(series["signups"][index]),
+                    intcomma(series["otp_sent"][index]),
+                    intcomma(series["otp_verified"][index]),
+                    intcomma(series["tokens_issued"][index]),
+                ]
+                for index in reversed(range(len(dates) - 7, len(dates)))
             ],
         },
     }
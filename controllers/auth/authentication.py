@@ -0,0 +1,13 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from configurations.timing import timed
+
+
+class TimedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication reported as the `auth` Server-Timing phase.
+    """
+
+    def authenticate(self, request):
+        with timed("auth"):
+            return super().authenticate(request)
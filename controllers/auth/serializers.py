@@ -1,18 +1,30 @@
 from constance import config
 from rest_framework import serializers
 from rest_framework.exceptions import NotFound, ParseError, ValidationError
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.tokens import TokenError
 
 from controllers.auth.utils import (
     check_valid_verification,
     generate_otp,
     send_verification_email,
 )
-from core.user.enums import OtpTypeEnum
-from core.user.models import OtpCode, User
+from core.common.serializers import TimedValidationMixin
+from core.user.enums import OtpTypeEnum, OTPVerificationStatusEnum
+from core.user.models import User
+from core.user.otp import get_otp_store
+from core.user.tokens import RefreshToken
 
 
-class LogoutSerializer(serializers.Serializer):
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+class LogoutSerializer(TimedValidationMixin, serializers.Serializer):
     refresh = serializers.CharField()
 
     def validate(self, attrs):
@@ -23,7 +35,7 @@ class LogoutSerializer(serializers.Serializer):
         return super().validate(attrs)
 
 
-class SendOTPSerializer(serializers.Serializer):
+class SendOTPSerializer(TimedValidationMixin, serializers.Serializer):
     email = serializers.EmailField(write_only=True, required=False)
     verification_type = serializers.ChoiceField(
         choices=OtpTypeEnum.choices, write_only=True, required=True
@@ -53,16 +65,11 @@ class SendOTPSerializer(serializers.Serializer):
                 to=email,
             )
             otp_code = generate_otp()
-            OtpCode.objects.filter(
-                user=user,
-                type_otp=verification_type,
-            ).update(is_used=True)
-
-            # Create new OTP
-            OtpCode.objects.create(
-                user=user,
-                code=otp_code,
-                type_otp=verification_type,
+            get_otp_store().issue(
+                user,
+                verification_type,
+                otp_code,
+                timeout=config.OTP_CODE_EXPIRATION_TIME * 60,
             )
             name = user.full_name or user.username
             send_verification_email(email, otp_code, name)
@@ -71,7 +78,7 @@ class SendOTPSerializer(serializers.Serializer):
         return super().validate(attrs)
 
 
-class VerifyOTPSerializer(serializers.Serializer):
+class VerifyOTPSerializer(TimedValidationMixin, serializers.Serializer):
     email = serializers.EmailField(write_only=True, required=False)
     code = serializers.CharField(write_only=True, required=True)
 
@@ -100,22 +107,11 @@ class VerifyOTPSerializer(serializers.Serializer):
                 verification_type=verification_type,
                 to=email,
             )
-            try:
-                otp_instance = OtpCode.objects.filter(
-                    user=user,
-                    code=code,
-                    type_otp=verification_type,
-                    is_used=False,
-                ).latest("-created_at")
-            except OtpCode.DoesNotExist:
-                raise ParseError("Invalid OTP code")
-
-            if otp_instance.is_expired:
+            status = get_otp_store().verify(user, verification_type, code)
+            if status == OTPVerificationStatusEnum.EXPIRED:
                 raise ParseError("OTP code has expired")
-
-            # Mark OTP as used
-            otp_instance.is_used = True
-            otp_instance.save()
+            if status != OTPVerificationStatusEnum.VERIFIED:
+                raise ParseError("Invalid OTP code")
 
             if verification_type == OtpTypeEnum.EMAIL:
                 user.settings.is_email_verified = True
@@ -124,7 +120,7 @@ class VerifyOTPSerializer(serializers.Serializer):
         return super().validate(attrs)
 
 
-class RegisterUserSerializer(serializers.ModelSerializer):
+class RegisterUserSerializer(TimedValidationMixin, serializers.ModelSerializer):
     message = serializers.CharField(
         read_only=True, default="User registered successfully"
     )
@@ -6,6 +6,7 @@ from django.template.loader import render_to_string
 from django.utils.translation import gettext_lazy as _
 from rest_framework.exceptions import ParseError
 
+from configurations.timing import timed
 from core.common.tasks import send_email_task
 from core.user.enums import OtpTypeEnum
 from core.user.models import User
@@ -37,14 +38,15 @@ def send_verification_email(email, otp_code, name):
     """Send verification email with OTP code"""
     subject = "Email Verification"
     expiration_time = config.OTP_CODE_EXPIRATION_TIME
-    html_message = render_to_string(
-        "emails/verify_email.html",
-        {
-            "otp_code": otp_code,
-            "expiration_time": expiration_time,
-            "name": name,
-        },
-    )
+    with timed("template"):
+        html_message = render_to_string(
+            "emails/verify_email.html",
+            {
+                "otp_code": otp_code,
+                "expiration_time": expiration_time,
+                "name": name,
+            },
+        )
 
     send_email_task.delay(
         subject=subject,
@@ -4,20 +4,29 @@ from rest_framework.response import Response
 from rest_framework.generics import GenericAPIView, CreateAPIView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from configurations.timing import timed
 from controllers.auth.serializers import (
     LogoutSerializer,
     SendOTPSerializer,
     RegisterUserSerializer,
     VerifyOTPSerializer,
 )
+from core.common.activity import record_activity
+from core.common.enums import ActivityTypeEnum
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
-    pass
+    def post(self, request, *args, **kwargs):
+        with timed("auth"):
+            response = super().post(request, *args, **kwargs)
+        record_activity(ActivityTypeEnum.LOGINS)
+        return response
 
 
 class CustomTokenRefreshView(TokenRefreshView):
-    pass
+    def post(self, request, *args, **kwargs):
+        with timed("auth"):
+            return super().post(request, *args, **kwargs)
 
 
 class LogoutView(GenericAPIView):
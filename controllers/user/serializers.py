@@ -1,9 +1,10 @@
 from rest_framework import serializers
 
+from core.common.serializers import TimedValidationMixin
 from core.user.models import User
 
 
-class MyProfileSerializer(serializers.ModelSerializer):
+class MyProfileSerializer(TimedValidationMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
@@ -0,0 +1,69 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from configurations.metrics import redis_calls
+from utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_KEY = "activity:{day}"
+ACTIVITY_DAYS = 63
+ACTIVITY_TIMEOUT = 70 * 24 * 60 * 60
+ACTIVITY_BACKOFF_SECONDS = 30
+
+# Monotonic time until which recording is skipped after a Redis failure
+backoff_until = 0.0
+
+
+def record_activity(kind: str, amount: int = 1):
+    """
+    Increment today's counter for `kind`.
+
+    Each day is a single Redis hash of counters that expires on its own, so
+    recording is one round trip and nothing is written to the database. After
+    a failure, recording is skipped for `ACTIVITY_BACKOFF_SECONDS` so an
+    unreachable Redis does not add its timeout to every request.
+    """
+    global backoff_until
+    if time.monotonic() < backoff_until:
+        return
+    key = ACTIVITY_KEY.format(day=timezone.localdate().isoformat())
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        pipeline.hincrby(key, kind, amount)
+        pipeline.expire(key, ACTIVITY_TIMEOUT)
+        redis_calls.add(1, {"operation": "activity.record"})
+        pipeline.execute()
+    except Exception as e:
+        backoff_until = time.monotonic() + ACTIVITY_BACKOFF_SECONDS
+        logger.warning(f"Failed to record {kind} activity: {e!r}")
+
+
+def get_activity(days: int = ACTIVITY_DAYS) -> list[tuple]:
+    """
+    Read the activity counters of the last `days` days in one round trip.
+
+    When Redis is unavailable every day is returned without counters, so the
+    dashboard still renders.
+
+    Returns:
+        List of (date, {kind: count}) tuples, oldest first
+    """
+    today = timezone.localdate()
+    dates = [today - timedelta(days=x) for x in reversed(range(days))]
+    try:
+        redis_calls.add(1, {"operation": "activity.get"})
+        pipeline = get_redis().pipeline(transaction=False)
+        for day in dates:
+            pipeline.hgetall(ACTIVITY_KEY.format(day=day.isoformat()))
+        results = pipeline.execute()
+    except Exception as e:
+        logger.warning(f"Failed to read activity: {e!r}")
+        results = [{} for _day in dates]
+    return [
+        (day, {key.decode(): int(value) for key, value in counters.items()})
+        for day, counters in zip(dates, results)
+    ]
@@ -5,3 +5,6 @@ from django.conf import settings
 class CommonConfig(AppConfig):
     default_auto_field = settings.DEFAULT_AUTO_FIELD
     name = "core.common"
+
+    def ready(self):
+        from core.common import signals  # noqa
@@ -0,0 +1,163 @@
+import logging
+import time
+from collections import OrderedDict
+from threading import RLock
+
+from constance import config as constance_config
+from constance import settings as constance_settings
+from constance import signals
+from constance.backends.redisd import RedisBackend
+from constance.codecs import dumps
+from django.conf import settings
+
+from configurations.metrics import constance_reads, redis_calls
+from configurations.timing import timed
+from utils.threads import ProcessThread
+
+logger = logging.getLogger(__name__)
+
+
+def get_values(config, keys: list, fresh: bool = False) -> dict:
+    """
+    Read several Constance values with a single backend round trip.
+
+    Args:
+        config: The Constance config wrapper
+        keys: Constance keys to read (e.g., ["SITE_TITLE", "COLORS__BASE"])
+        fresh: Skip the local cache of LocalCachedRedisBackend
+
+    Returns:
+        Dictionary of key to value, falling back to the configured default
+        for keys that are not stored in the backend yet
+    """
+    keys = [key for key in keys if key in constance_settings.CONFIG]
+    backend = config._backend
+    if fresh and isinstance(backend, LocalCachedRedisBackend):
+        items = backend.mget(keys, fresh=True)
+    else:
+        items = backend.mget(keys)
+    values = dict(items or ())
+    for key in keys:
+        if key not in values:
+            values[key] = constance_settings.CONFIG[key][0]
+    return values
+
+
+class LocalCachedRedisBackend(RedisBackend):
+    """
+    Redis backend with a bounded, per-process TTL cache in front of it.
+
+    Every write publishes the changed key on a pub/sub channel. Each process
+    runs a listener thread that evicts the key from its local cache as soon as
+    the message arrives, so reads only hit Redis after a change or once an
+    entry expires. The TTL bounds staleness if a message is ever missed.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._timeout = getattr(settings, "CONSTANCE_LOCAL_CACHE_TIMEOUT", 60)
+        self._max_size = getattr(settings, "CONSTANCE_LOCAL_CACHE_MAX_SIZE", 256)
+        self._channel = getattr(
+            settings,
+            "CONSTANCE_INVALIDATION_CHANNEL",
+            self.add_prefix("invalidate"),
+        )
+        self._cache = OrderedDict()
+        self._lock = RLock()
+        self._generation = 0
+        # Values cached by the parent process are dropped after a fork.
+        self._listener = ProcessThread(
+            self._listen, name="constance-invalidation", on_start=self.clear
+        )
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._rd.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                # Messages may have been missed while we were not subscribed.
+                self.clear()
+                for message in pubsub.listen():
+                    key = message["data"]
+                    if isinstance(key, bytes):
+                        key = key.decode("utf-8")
+                    self.evict(key)
+            except Exception as e:
+                logger.warning(f"Constance invalidation listener failed: {e}")
+                self.clear()
+                time.sleep(1)
+
+    def _cache_value(self, key, value, generation):
+        with self._lock:
+            # Skip the store if an invalidation arrived while we were reading.
+            if generation != self._generation:
+                return
+            self._cache.pop(key, None)
+            self._cache[key] = (time.monotonic() + self._timeout, value)
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+
+    def evict(self, key):
+        with self._lock:
+            self._generation += 1
+            self._cache.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def get(self, key):
+        self._listener.ensure_started()
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            constance_reads.add(1, {"result": "hit"})
+            return entry[1]
+
+        constance_reads.add(1, {"result": "miss"})
+        redis_calls.add(1, {"operation": "constance.get"})
+        generation = self._generation
+        with timed("constance"):
+            value = super().get(key)
+        self._cache_value(key, value, generation)
+        return value
+
+    def mget(self, keys, fresh=False):
+        if not keys:
+            return
+        self._listener.ensure_started()
+
+        now = time.monotonic()
+        missing = []
+        for key in keys:
+            entry = None if fresh else self._cache.get(key)
+            if entry is not None and entry[0] > now:
+                if entry[1] is not None:
+                    yield key, entry[1]
+            else:
+                missing.append(key)
+
+        constance_reads.add(len(keys) - len(missing), {"result": "hit"})
+        if missing:
+            constance_reads.add(len(missing), {"result": "miss"})
+            redis_calls.add(1, {"operation": "constance.mget"})
+            generation = self._generation
+            with timed("constance"):
+                values = dict(super().mget(missing))
+            for key in missing:
+                value = values.get(key)
+                self._cache_value(key, value, generation)
+                if value is not None:
+                    yield key, value
+
+    def set(self, key, value):
+        # Unlike RedisBackend.set, evict and publish before sending
+        # config_updated: receivers may rebuild from this key right away.
+        redis_calls.add(3, {"operation": "constance.set"})
+        old_value = super().get(key)
+        self._rd.set(self.add_prefix(key), dumps(value))
+        self.evict(key)
+        self._rd.publish(self._channel, key)
+        signals.config_updated.send(
+            sender=constance_config, key=key, old_value=old_value, new_value=value
+        )
@@ -0,0 +1,192 @@
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from core.common.activity import get_activity
+from core.common.enums import ActivityTypeEnum
+from core.common.models import CohortRetention
+from core.user.models import OtpCode, User, UserSettings
+from core.user.tokens import get_token_blacklist
+
+DASHBOARD_SNAPSHOT_KEY = "dashboard:snapshot"
+DASHBOARD_SNAPSHOT_DAYS = 28
+COHORT_ROWS = 8
+COHORT_DAYS = 9
+
+
+def start_of_day(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def count_by_day(queryset, field: str, since: datetime) -> dict[str, int]:
+    """
+    Count rows per local day of `field`, starting at `since`.
+
+    Returns:
+        Dictionary of ISO date to number of rows
+    """
+    rows = (
+        queryset.filter(**{f"{field}__gte": since})
+        .annotate(day=TruncDate(field))
+        .values("day")
+        .annotate(total=Count("pk"))
+        .values_list("day", "total")
+    )
+    return {day.isoformat(): total for day, total in rows}
+
+
+def count_tokens_issued(since: datetime, days: int) -> dict[str, int]:
+    """
+    Count issued refresh tokens per local day, starting at `since`.
+
+    The database blacklist keeps a row per token. A blacklist backend does
+    not, so its tokens are counted as activity when they are issued.
+
+    Returns:
+        Dictionary of ISO date to number of tokens
+    """
+    if get_token_blacklist() is None:
+        return count_by_day(OutstandingToken.objects.all(), "created_at", since)
+    return {
+        day.isoformat(): counters.get(ActivityTypeEnum.TOKENS_ISSUED, 0)
+        for day, counters in get_activity(days)
+    }
+
+
+def build_snapshot(days: int = DASHBOARD_SNAPSHOT_DAYS) -> dict:
+    """
+    Aggregate the dashboard KPIs for the last `days` days.
+
+    Every series is computed with a single grouped query, so the cost depends
+    on the number of rows in the window and not on the number of renders.
+    """
+    today = timezone.localdate()
+    dates = [(today - timedelta(days=x)).isoformat() for x in reversed(range(days))]
+    since = start_of_day(today - timedelta(days=days - 1))
+    series = {
+        "signups": count_by_day(User.objects.all(), "date_joined", since),
+        "otp_sent": count_by_day(OtpCode.objects.all(), "created_at", since),
+        "otp_verified": count_by_day(OtpCode.objects.all(), "verified_at", since),
+        "tokens_issued": count_tokens_issued(since, days),
+    }
+    return {
+        "generated_at": timezone.now().isoformat(),
+        "dates": dates,
+        "series": {
+            name: [counts.get(date, 0) for date in dates]
+            for name, counts in series.items()
+        },
+        "totals": {
+            "users": User.objects.count(),
+            "email_verified": UserSettings.objects.filter(
+                is_email_verified=True
+            ).count(),
+        },
+    }
+
+
+def refresh_snapshot() -> dict:
+    snapshot = build_snapshot()
+    cache.set(
+        DASHBOARD_SNAPSHOT_KEY,
+        snapshot,
+        timeout=settings.DASHBOARD_SNAPSHOT_TIMEOUT,
+    )
+    return snapshot
+
+
+def get_snapshot() -> dict:
+    """
+    Return the latest dashboard snapshot.
+
+    The snapshot is refreshed by the `refresh_dashboard_snapshot` beat task.
+    It is only built inline when the cache is cold, e.g. right after deploy.
+    """
+    snapshot = cache.get(DASHBOARD_SNAPSHOT_KEY)
+    if snapshot is None:
+        snapshot = refresh_snapshot()
+    return snapshot
+
+
+def materialize_cohorts(day: date) -> int:
+    """
+    Append the retention cells observed on `day` for the recent cohorts.
+
+    A single grouped query over the users who joined in the last
+    `COHORT_DAYS` days counts, per signup day, the cohort size and the users
+    whose last login is on or after `day`. Older cohorts are never rescanned.
+
+    Returns:
+        Number of rows created
+    """
+    first_cohort = day - timedelta(days=COHORT_DAYS - 1)
+    rows = (
+        User.objects.filter(
+            date_joined__gte=start_of_day(first_cohort),
+            date_joined__lt=start_of_day(day + timedelta(days=1)),
+        )
+        .annotate(cohort=TruncDate("date_joined"))
+        .values("cohort")
+        .annotate(
+            total=Count("pk"),
+            active=Count("pk", filter=Q(last_login__gte=start_of_day(day))),
+        )
+        .values_list("cohort", "total", "active")
+    )
+    cells = []
+    for cohort, total, active in rows:
+        offset = (day - cohort).days
+        cells.append(
+            CohortRetention(
+                cohort=cohort,
+                day=offset,
+                users=total if offset == 0 else active,
+            )
+        )
+    # The size row marks `day` as materialized even when nobody signed up.
+    if not any(cell.cohort == day for cell in cells):
+        cells.append(CohortRetention(cohort=day, day=0, users=0))
+    # bulk_create returns every object even when its row already existed.
+    window = CohortRetention.objects.filter(cohort__range=(first_cohort, day))
+    existing = window.count()
+    CohortRetention.objects.bulk_create(cells, ignore_conflicts=True)
+    return window.count() - existing
+
+
+def refresh_cohorts() -> int:
+    """
+    Materialize every day since the last run, up to and including yesterday.
+    """
+    yesterday = timezone.localdate() - timedelta(days=1)
+    last_day = CohortRetention.objects.aggregate(last_day=Max("cohort"))["last_day"]
+    day = yesterday - timedelta(days=COHORT_DAYS - 1)
+    if last_day is not None:
+        day = max(day, last_day + timedelta(days=1))
+
+    created = 0
+    while day <= yesterday:
+        created += materialize_cohorts(day)
+        day += timedelta(days=1)
+    return created
+
+
+def get_cohorts(rows: int = COHORT_ROWS) -> dict[date, dict[int, int]]:
+    """
+    Return the retention cells of the last `rows` cohorts.
+
+    Returns:
+        Dictionary of cohort date to a dictionary of day offset to users
+    """
+    since = timezone.localdate() - timedelta(days=rows)
+    result = {}
+    queryset = CohortRetention.objects.filter(cohort__gte=since).values_list(
+        "cohort", "day", "users"
+    )
+    for cohort, day, users in queryset:
+        result.setdefault(cohort, {})[day] = users
+    return result
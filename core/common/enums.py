@@ -0,0 +1,8 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class ActivityTypeEnum(models.TextChoices):
+    LOGINS = "logins", _("Logins")
+    API_CALLS = "api_calls", _("API calls")
+    TOKENS_ISSUED = "tokens_issued", _("Tokens issued")
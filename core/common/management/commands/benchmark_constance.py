@@ -0,0 +1,74 @@
+import time
+
+from constance import config
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.common.constance import get_values
+from core.sites import callback_constance, convert_config, unfold_context
+
+
+class CountingClient:
+    """
+    Proxy around a redis client that counts every command sent to the server.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            self.calls += 1
+            return attr(*args, **kwargs)
+
+        return wrapper
+
+
+def legacy_values(keys: list) -> dict:
+    values = {}
+    for key in keys:
+        if hasattr(config, key):
+            values[key] = getattr(config, key)
+    return values
+
+
+class Command(BaseCommand):
+    help = "Compare Redis round trips of the Unfold theme pipeline per render."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--renders", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = config._backend
+        if not hasattr(backend, "_rd"):
+            self.stderr.write("This benchmark requires a Redis Constance backend.")
+            return
+
+        renders = options["renders"]
+        keys = [key.upper() for key in unfold_context.fields]
+        readers = {
+            "hasattr/getattr": legacy_values,
+            "mget": lambda keys: get_values(config, keys),
+        }
+
+        client = backend._rd
+        for name, reader in readers.items():
+            backend._rd = counter = CountingClient(client)
+            started = time.perf_counter()
+            try:
+                for _ in range(renders):
+                    values = reader(keys)
+                    convert_config(values, settings.CONSTANCE_CONFIG_FOR_UNFOLD)
+                    callback_constance(values)
+            finally:
+                backend._rd = client
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{name:>16}: {counter.calls / renders:.1f} round trips/render, "
+                f"{elapsed / renders * 1000:.3f} ms/render"
+            )
@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.user.enums import OtpTypeEnum
+from core.user.models import OtpCode, User
+from core.user.otp import DatabaseOtpStore
+
+
+def percentile(samples: list[float], ratio: float) -> float:
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * ratio), len(samples) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure OTP send/verify latency of DatabaseOtpStore as the OtpCode "
+        "history grows. Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--drop-indexes",
+            action="store_true",
+            help="Measure without the OtpCode lookup indexes.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(**options)
+            transaction.set_rollback(True)
+
+    def run(self, rows, users, repeat, batch_size, drop_indexes, **options):
+        if drop_indexes:
+            # Plain DDL, as the SQLite schema editor refuses to run here.
+            with connection.cursor() as cursor:
+                for index in OtpCode._meta.indexes:
+                    cursor.execute(
+                        f"DROP INDEX {connection.ops.quote_name(index.name)}"
+                    )
+
+        users = User.objects.bulk_create(
+            User(username=f"otp-benchmark-{x}", email=f"otp-benchmark-{x}@example.com")
+            for x in range(users)
+        )
+        store = DatabaseOtpStore()
+        expired = timezone.now() - timedelta(days=1)
+
+        self.stdout.write(
+            f"{'history':>10} {'send p50':>10} {'verify p50':>11} {'p95':>8}"
+        )
+        created = 0
+        for target in sorted({rows // 1000, rows // 100, rows // 10, rows}):
+            while created < target:
+                size = min(batch_size, target - created)
+                OtpCode.objects.bulk_create(
+                    OtpCode(
+                        user=random.choice(users),
+                        code=f"{random.randrange(10**6):06d}",
+                        type_otp=OtpTypeEnum.EMAIL,
+                        expires_at=expired,
+                        is_used=True,
+                    )
+                    for _ in range(size)
+                )
+                created += size
+
+            sends, verifies = [], []
+            for _ in range(repeat):
+                user = random.choice(users)
+                started = time.perf_counter()
+                store.issue(user, OtpTypeEnum.EMAIL, "123456", timeout=600)
+                sends.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                store.verify(user, OtpTypeEnum.EMAIL, "123456")
+                verifies.append(time.perf_counter() - started)
+
+            self.stdout.write(
+                f"{created:>10,} {statistics.median(sends) * 1000:>7.3f} ms "
+                f"{statistics.median(verifies) * 1000:>8.3f} ms "
+                f"{percentile(verifies, 0.95) * 1000:>5.3f} ms"
+            )
+
+        plan = (
+            OtpCode.objects.filter(
+                user=users[0],
+                code="123456",
+                type_otp=OtpTypeEnum.EMAIL,
+                is_used=False,
+            )
+            .order_by("created_at")
+            .explain()
+        )
+        self.stdout.write(f"Verify plan:\n{plan}")
@@ -0,0 +1,88 @@
+import json
+import timeit
+from copy import deepcopy
+
+from django.core.management.base import BaseCommand
+
+from configurations.logging import HIDDEN_FIELDS, get_sanitizer, sanitize_data
+
+
+def legacy_sanitize(data, hidden_fields=HIDDEN_FIELDS, mask_value="****"):
+    """
+    The deepcopy based implementation replaced by `Sanitizer`, kept here as
+    the baseline of the benchmark.
+    """
+
+    def recursive(data):
+        if isinstance(data, dict):
+            for key, value in data.items():
+                fields_to_check = [field.lower() for field in hidden_fields]
+                if key.lower() in fields_to_check:
+                    data[key] = mask_value
+                elif isinstance(value, (dict, list)):
+                    data[key] = recursive(value)
+        elif isinstance(data, list):
+            return [recursive(item) for item in data]
+        return data
+
+    return recursive(deepcopy(data))
+
+
+def build_payloads() -> dict:
+    profile = {
+        "id": 1,
+        "username": "john.doe@example.com",
+        "email": "john.doe@example.com",
+        "first_name": "John",
+        "last_name": "Doe",
+        "settings": {
+            "is_email_verified": True,
+            "config": {"language": "en", "theme": "dark", "notifications": [1, 2]},
+        },
+    }
+    return {
+        "login": {
+            "refresh": "x" * 230,
+            "access": "x" * 230,
+            "user": profile,
+        },
+        "profiles": {
+            "count": 200,
+            "next": None,
+            "previous": None,
+            "results": [dict(profile, id=index) for index in range(200)],
+        },
+        "nested_secrets": {
+            "results": [
+                {"id": index, "credentials": {"token": "x" * 40}, "profile": profile}
+                for index in range(200)
+            ],
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare the sanitizer implementations over realistic payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=200)
+
+    def handle(self, *args, **options):
+        number = options["number"]
+        sanitizer = get_sanitizer()
+        cases = {
+            "legacy + dumps": lambda data: json.dumps(legacy_sanitize(data)),
+            "sanitize + dumps": lambda data: json.dumps(sanitize_data(data)),
+            "encode_bytes": lambda data: sanitizer.encode_bytes(data, 10**9),
+            "streaming encode": lambda data: "".join(sanitizer.iterencode(data)),
+        }
+
+        for name, payload in build_payloads().items():
+            expected = json.loads(json.dumps(legacy_sanitize(payload)))
+            self.stdout.write(f"{name} ({len(json.dumps(payload)):,} bytes)")
+            for case, func in cases.items():
+                assert json.loads(func(payload)) == expected, case
+                elapsed = timeit.timeit(lambda: func(payload), number=number)
+                self.stdout.write(
+                    f"  {case:>18}: {elapsed / number * 1_000_000:,.1f} us/op"
+                )
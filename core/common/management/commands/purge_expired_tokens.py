@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.common.tasks import get_expired_tokens
+from utils.db import delete_in_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding and blacklisted tokens in chunks, without "
+        "the time limit of the scheduled task. Tokens still counted on the "
+        "dashboard are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.CLEANUP["BATCH_SIZE"]
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=settings.CLEANUP["PAUSE_SECONDS"],
+            help="Seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--max-seconds",
+            type=float,
+            default=None,
+            help="Stop after this many seconds, runs until done by default.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the expired tokens.",
+        )
+
+    def handle(self, *args, **options):
+        queryset = get_expired_tokens()
+        if options["dry_run"]:
+            self.stdout.write(f"{queryset.count()} expired tokens")
+            return
+
+        deleted = delete_in_chunks(
+            queryset,
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            max_seconds=options["max_seconds"],
+        )
+        self.stdout.write(f"Deleted {deleted} token rows")
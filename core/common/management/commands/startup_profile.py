@@ -0,0 +1,75 @@
+import re
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+TARGETS = {
+    "wsgi": "import configurations.wsgi",
+    "celery": "import configurations.celery as app; app.worker_init()",
+}
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| +(\S+)$")
+
+
+def profile_imports(code: str) -> list[tuple[str, int, int]]:
+    """
+    Run `code` in a fresh interpreter with `-X importtime`.
+
+    Returns (module, self us, cumulative us) in import order.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in process.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            own, cumulative, module = match.groups()
+            imports.append((module, int(own), int(cumulative)))
+    return imports
+
+
+class Command(BaseCommand):
+    help = "Report import time per module for a cold start of a uwsgi or Celery worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("target", choices=TARGETS, nargs="?", default="wsgi")
+        parser.add_argument("--limit", type=int, default=25)
+        parser.add_argument(
+            "--sort",
+            choices=["cumulative", "self"],
+            default="cumulative",
+        )
+        parser.add_argument(
+            "--packages",
+            action="store_true",
+            help="Group self time by top level package.",
+        )
+
+    def handle(self, *args, **options):
+        imports = profile_imports(TARGETS[options["target"]])
+        total = sum(own for _, own, _ in imports)
+        self.stdout.write(
+            f"{options['target']}: {len(imports)} modules, {total / 1000:,.1f} ms"
+        )
+
+        if options["packages"]:
+            packages = {}
+            for module, own, _ in imports:
+                package = module.split(".", 1)[0]
+                packages[package] = packages.get(package, 0) + own
+            rows = sorted(packages.items(), key=lambda row: row[1], reverse=True)
+            for package, own in rows[: options["limit"]]:
+                self.stdout.write(f"{own / 1000:>10,.1f} ms  {package}")
+            return
+
+        index = 1 if options["sort"] == "self" else 2
+        rows = sorted(imports, key=lambda row: row[index], reverse=True)
+        self.stdout.write(f"{'self':>10} {'cumulative':>13}  module")
+        for module, own, cumulative in rows[: options["limit"]]:
+            self.stdout.write(
+                f"{own / 1000:>7,.1f} ms {cumulative / 1000:>10,.1f} ms  {module}"
+            )
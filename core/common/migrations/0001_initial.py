@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="CohortRetention",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cohort", models.DateField(verbose_name="Cohort")),
+                (
+                    "day",
+                    models.PositiveSmallIntegerField(verbose_name="Days since signup"),
+                ),
+                ("users", models.PositiveIntegerField(default=0, verbose_name="Users")),
+            ],
+            options={
+                "verbose_name": "Cohort retention",
+                "verbose_name_plural": "Cohort retention",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("cohort", "day"), name="unique_cohort_retention_day"
+                    )
+                ],
+            },
+        ),
+    ]
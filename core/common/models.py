@@ -0,0 +1,28 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class CohortRetention(models.Model):
+    """
+    Materialized signup-cohort retention, one row per cohort and day offset.
+
+    Rows are appended once a day by `refresh_cohort_retention` and never
+    rewritten, so reading the dashboard matrix is a single index range scan.
+    """
+
+    cohort = models.DateField(_("Cohort"))
+    day = models.PositiveSmallIntegerField(_("Days since signup"))
+    users = models.PositiveIntegerField(_("Users"), default=0)
+
+    class Meta:
+        verbose_name = _("Cohort retention")
+        verbose_name_plural = _("Cohort retention")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cohort", "day"],
+                name="unique_cohort_retention_day",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.cohort} +{self.day}: {self.users}"
@@ -0,0 +1,11 @@
+from configurations.timing import timed
+
+
+class TimedValidationMixin:
+    """
+    Serializer mixin reporting validation as the `validate` Server-Timing phase.
+    """
+
+    def is_valid(self, *, raise_exception=False):
+        with timed("validate"):
+            return super().is_valid(raise_exception=raise_exception)
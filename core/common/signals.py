@@ -0,0 +1,21 @@
+from constance.signals import config_updated
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+
+from core.common.activity import record_activity
+from core.common.enums import ActivityTypeEnum
+from core.sites import unfold_context
+
+
+@receiver(config_updated)
+def invalidate_unfold_context(sender, key, old_value, new_value, **kwargs):
+    """
+    Drop the cached Unfold context when one of its Constance values changes.
+    """
+    if key.lower() in unfold_context.fields:
+        unfold_context.invalidate()
+
+
+@receiver(user_logged_in)
+def record_login(sender, request, user, **kwargs):
+    record_activity(ActivityTypeEnum.LOGINS)
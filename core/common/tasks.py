@@ -1,9 +1,13 @@
 import logging
+from datetime import timedelta
 
 from django.conf import settings
 from django.core.mail import send_mail
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 
 from configurations.celery import app
+from utils.db import delete_in_chunks
 
 logger = logging.getLogger(__name__)
 
@@ -30,3 +34,46 @@ def send_email_task(*args, **kwargs):
     except Exception as e:
         logger.error(f"Error sending email: {e}")
         raise e
+
+
+@app.task(name="refresh_dashboard_snapshot")
+def refresh_dashboard_snapshot():
+    from core.common.dashboard import refresh_snapshot
+
+    snapshot = refresh_snapshot()
+    logger.info(f"Dashboard snapshot refreshed at {snapshot['generated_at']}")
+
+
+@app.task(name="refresh_cohort_retention")
+def refresh_cohort_retention():
+    from core.common.dashboard import refresh_cohorts
+
+    created = refresh_cohorts()
+    logger.info(f"Cohort retention refreshed, {created} rows created")
+
+
+def get_expired_tokens():
+    """
+    Outstanding tokens that expired before the dashboard window.
+
+    The `tokens_issued` series of the snapshot is counted from these rows, so
+    they are kept for `DASHBOARD_SNAPSHOT_DAYS` after they expire.
+    """
+    from core.common.dashboard import DASHBOARD_SNAPSHOT_DAYS
+
+    cutoff = timezone.now() - timedelta(days=DASHBOARD_SNAPSHOT_DAYS)
+    return OutstandingToken.objects.filter(expires_at__lte=cutoff)
+
+
+@app.task(name="purge_expired_tokens", ignore_result=True)
+def purge_expired_tokens():
+    """
+    Delete expired outstanding tokens, their blacklist entries cascade.
+    """
+    deleted = delete_in_chunks(
+        get_expired_tokens(),
+        batch_size=settings.CLEANUP["BATCH_SIZE"],
+        pause=settings.CLEANUP["PAUSE_SECONDS"],
+        max_seconds=settings.CLEANUP["MAX_SECONDS"],
+    )
+    logger.info(f"Purged {deleted} expired token rows")
@@ -0,0 +1,1157 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from datetime import timedelta
+from io import StringIO
+from itertools import product
+from types import SimpleNamespace
+from unittest import mock
+
+from constance import config
+from constance.codecs import dumps
+from constance.signals import config_updated
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import Resolver404, resolve, reverse
+from django.utils import timezone, translation
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import StatusCode
+from opentelemetry.trace.propagation.tracecontext import (
+    TraceContextTextMapPropagator,
+)
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from configurations.events import EventQueue
+from configurations.exporting import DROPPED_EVENTS, SheddingSpanProcessor
+from configurations.celery import app, stamp_trace_context, stop_task_timer
+from configurations.logging import (
+    TRUNCATED_MARKER,
+    JSONFormatter,
+    encode_redacted,
+    log_context,
+    sanitize_data,
+)
+from configurations.middleware import (
+    CapturePolicy,
+    QueryBudgetMiddleware,
+    MetricsMiddleware,
+    ServerTimingMiddleware,
+    TracingMiddleware,
+)
+from configurations.queries import QueryBudgetExceeded, query_budget
+from configurations.sampling import TailSamplingSpanProcessor, get_sampler
+from configurations.timing import NOOP, timed
+from core.common.activity import ACTIVITY_DAYS, get_activity, record_activity
+from core.common.enums import ActivityTypeEnum
+from core.common.constance import LocalCachedRedisBackend, get_values
+from controllers.admin.views import dashboard_data
+from core.common.dashboard import (
+    COHORT_DAYS,
+    DASHBOARD_SNAPSHOT_DAYS,
+    build_snapshot,
+    get_snapshot,
+    materialize_cohorts,
+    refresh_cohorts,
+    start_of_day,
+)
+from core.common.models import CohortRetention
+from core.common.tasks import purge_expired_tokens
+from core.sites import (
+    ERROR_PAGES_MAX_SIZE,
+    admin_site,
+    callback_constance,
+    palette_registry,
+    unfold_context,
+)
+from core.user.enums import OtpTypeEnum
+from core.user.models import OtpCode, User
+from core.user.tasks import purge_otp_codes
+from utils.bloom import BloomFilter
+from utils.redis import get_redis
+from utils.threads import ProcessThread
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the few redis-py commands used by the project.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.published = []
+
+    @staticmethod
+    def encode(value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = self.encode(value)
+        self.ttls[key] = ex
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def ttl(self, key):
+        return self.ttls.get(key)
+
+    def hincrby(self, key, field, amount=1):
+        counters = self.data.setdefault(key, {})
+        counters[self.encode(field)] = counters.get(self.encode(field), 0) + amount
+        return counters[self.encode(field)]
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.data.get(key, {})
+        for member, score in list(members.items()):
+            if score <= high:
+                del members[member]
+
+    def zrange(self, key, start, end):
+        members = self.data.get(key, {})
+        return [self.encode(member) for member in sorted(members, key=members.get)]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((getattr(self.client, name), args, kwargs))
+            return self
+
+        return command
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [method(*args, **kwargs) for method, args, kwargs in commands]
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LocalCachedRedisBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.backend = LocalCachedRedisBackend()
+        self.backend._rd = self.redis = FakeRedis()
+        # Keep the invalidation listener from connecting.
+        self.backend._listener.pid = os.getpid()
+        self.redis.set(self.backend.add_prefix("SITE_TITLE"), dumps("Old"))
+        self.assertEqual(self.backend.get("SITE_TITLE"), "Old")
+
+    def test_evicts_and_publishes_before_config_updated(self):
+        seen = []
+
+        def receiver(key, **kwargs):
+            seen.append((dict(self.backend.mget([key])), list(self.redis.published)))
+
+        config_updated.connect(receiver)
+        self.addCleanup(config_updated.disconnect, receiver)
+        self.backend.set("SITE_TITLE", "New")
+
+        self.assertEqual(
+            seen, [({"SITE_TITLE": "New"}, [(self.backend._channel, "SITE_TITLE")])]
+        )
+
+    def test_fresh_read_skips_stale_local_cache(self):
+        # Written by another process whose invalidation was not received yet.
+        self.redis.set(self.backend.add_prefix("SITE_TITLE"), dumps("New"))
+        wrapper = SimpleNamespace(_backend=self.backend)
+
+        self.assertEqual(get_values(wrapper, ["SITE_TITLE"])["SITE_TITLE"], "Old")
+        self.assertEqual(
+            get_values(wrapper, ["SITE_TITLE"], fresh=True)["SITE_TITLE"], "New"
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UnfoldContextTests(SimpleTestCase):
+    def setUp(self):
+        unfold_context._context = None
+        patcher = mock.patch(
+            "core.sites.get_values", return_value={"SITE_TITLE": "Boilerplate"}
+        )
+        self.get_values = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def update(self, key):
+        config_updated.send(sender=None, key=key, old_value=None, new_value="new")
+
+    def test_unfold_key_bumps_version_and_rebuilds(self):
+        self.assertEqual(unfold_context.get()["site_title"], "Boilerplate")
+        unfold_context.get()
+        self.assertEqual(self.get_values.call_count, 1)
+
+        version = unfold_context.get_version()
+        self.get_values.return_value = {"SITE_TITLE": "Renamed"}
+        self.update("SITE_TITLE")
+
+        self.assertEqual(unfold_context.get_version(), version + 1)
+        self.assertEqual(unfold_context.get()["site_title"], "Renamed")
+        self.assertEqual(self.get_values.call_count, 2)
+        self.get_values.assert_called_with(config, mock.ANY, fresh=True)
+
+    def test_unrelated_key_keeps_context(self):
+        unfold_context.get()
+        version = unfold_context.get_version()
+        self.update("OTP_CODE_EXPIRATION_TIME")
+
+        self.assertEqual(unfold_context.get_version(), version)
+        unfold_context.get()
+        self.assertEqual(self.get_values.call_count, 1)
+
+
+class PaletteRegistryTests(SimpleTestCase):
+    def test_every_combination_matches_callback(self):
+        fields = list(palette_registry._choices)
+        for key in product(*palette_registry._choices.values()):
+            values = dict(zip(fields, key))
+            with self.subTest(values=values):
+                self.assertEqual(
+                    palette_registry.lookup(values), callback_constance(values)
+                )
+
+    def test_unknown_and_missing_values(self):
+        unknown = {field: "unknown" for field in palette_registry._choices}
+
+        self.assertEqual(palette_registry.lookup(unknown), callback_constance(unknown))
+        self.assertEqual(palette_registry.lookup({}), callback_constance({}))
+
+    def test_fragments_are_read_only(self):
+        fragment = palette_registry.lookup({})
+
+        with self.assertRaises(TypeError):
+            fragment["colors"] = {}
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    STORAGES={
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+        }
+    },
+)
+class AdminErrorPageTests(SimpleTestCase):
+    def setUp(self):
+        admin_site._error_pages.clear()
+        admin_site._json_errors.clear()
+        unfold_context._context = None
+        patcher = mock.patch("core.sites.get_values", return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def not_found(self, user=None):
+        request = self.factory.get("/en/admin/missing/")
+        if user is not None:
+            request.user = user
+        with mock.patch.object(
+            admin_site, "each_context", wraps=admin_site.each_context
+        ) as each_context:
+            response = admin_site.not_found(request)
+        return response, each_context.call_count
+
+    def test_anonymous_hit_skips_each_context(self):
+        first, calls = self.not_found()
+        self.assertEqual((first.status_code, calls), (404, 1))
+
+        second, calls = self.not_found()
+        self.assertEqual((second.status_code, calls), (404, 0))
+        self.assertEqual(second.content, first.content)
+
+    def test_authenticated_user_is_rendered_every_time(self):
+        user = User(is_active=True, is_staff=True, is_superuser=True)
+        for _ in range(2):
+            response, calls = self.not_found(user)
+            self.assertEqual((response.status_code, calls), (404, 1))
+        self.assertEqual(admin_site._error_pages, {})
+
+    def test_key_varies_with_language_and_theme_version(self):
+        self.not_found()
+        with translation.override("vi"):
+            _, calls = self.not_found()
+        self.assertEqual(calls, 1)
+
+        unfold_context.invalidate()
+        _, calls = self.not_found()
+        self.assertEqual(calls, 1)
+        self.assertEqual(len(admin_site._error_pages), 3)
+
+    def test_cache_is_bounded(self):
+        for index in range(ERROR_PAGES_MAX_SIZE):
+            admin_site._error_pages[("filler", index)] = b""
+        self.not_found()
+
+        self.assertEqual(len(admin_site._error_pages), 1)
+
+    def test_json_body_is_reused(self):
+        request = self.factory.get("/api/missing/")
+        first = admin_site.not_found(request)
+        second = admin_site.not_found(request)
+
+        self.assertEqual(first["Content-Type"], "application/json")
+        self.assertIs(first.content, second.content)
+        self.assertEqual(len(admin_site._json_errors), 1)
+
+
+class RedisOutageTests(SimpleTestCase):
+    @override_settings(
+        REDIS_URL="redis://localhost:6379/0",
+        REDIS_CONNECT_TIMEOUT=0.25,
+        REDIS_SOCKET_TIMEOUT=0.5,
+    )
+    def test_client_times_out(self):
+        get_redis.cache_clear()
+        self.addCleanup(get_redis.cache_clear)
+
+        options = get_redis().connection_pool.connection_kwargs
+        self.assertEqual(options["socket_connect_timeout"], 0.25)
+        self.assertEqual(options["socket_timeout"], 0.5)
+
+    def test_activity_is_empty_when_redis_is_down(self):
+        client = mock.Mock()
+        client.pipeline.return_value.execute.side_effect = ConnectionError
+        with mock.patch("core.common.activity.get_redis", return_value=client):
+            with self.assertLogs("core.common.activity", "WARNING") as logs:
+                activity = get_activity()
+
+        self.assertIn("ConnectionError()", logs.output[0])
+
+        self.assertEqual(len(activity), ACTIVITY_DAYS)
+        self.assertEqual(activity[-1], (timezone.localdate(), {}))
+        self.assertTrue(all(counters == {} for _day, counters in activity))
+
+    def test_recording_backs_off_after_a_failure(self):
+        client = mock.Mock()
+        client.pipeline.return_value.execute.side_effect = ConnectionError
+        with mock.patch("core.common.activity.get_redis", return_value=client):
+            with mock.patch("core.common.activity.backoff_until", 0.0):
+                with self.assertLogs("core.common.activity", "WARNING"):
+                    record_activity(ActivityTypeEnum.API_CALLS)
+                record_activity(ActivityTypeEnum.API_CALLS)
+
+        self.assertEqual(client.pipeline.call_count, 1)
+
+    def test_recording_increments_todays_counter(self):
+        redis = FakeRedis()
+        with mock.patch("core.common.activity.get_redis", return_value=redis):
+            record_activity(ActivityTypeEnum.LOGINS)
+            record_activity(ActivityTypeEnum.LOGINS, 2)
+            activity = get_activity()
+
+        self.assertEqual(activity[-1][1], {ActivityTypeEnum.LOGINS: 3})
+
+
+class TracingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.tracer = TracerProvider().get_tracer(__name__)
+        self.calls = 0
+
+    def view(self, request):
+        self.calls += 1
+        return HttpResponse()
+
+    def failing_view(self, request):
+        self.calls += 1
+        raise ValueError("view failed")
+
+    def test_view_runs_once_when_body_cannot_be_parsed(self):
+        request = self.factory.post(
+            "/api/auth/login/",
+            data="{not json",
+            content_type="application/json",
+        )
+        with self.tracer.start_as_current_span("request"):
+            with self.assertLogs("configurations.middleware", level="ERROR"):
+                response = TracingMiddleware(self.view)(request)
+
+        self.assertEqual(self.calls, 1)
+        self.assertIn("X-Trace-ID", response)
+
+    def test_view_runs_once_when_view_raises(self):
+        request = self.factory.get("/api/users/my-profile/")
+        with self.tracer.start_as_current_span("request"):
+            with self.assertRaises(ValueError):
+                TracingMiddleware(self.failing_view)(request)
+
+        self.assertEqual(self.calls, 1)
+
+    def test_view_runs_once_without_recording_span(self):
+        request = self.factory.post(
+            "/api/auth/login/",
+            data="{not json",
+            content_type="application/json",
+        )
+        response = TracingMiddleware(self.view)(request)
+
+        self.assertEqual(self.calls, 1)
+        self.assertNotIn("X-Trace-ID", response)
+
+
+class CapturePolicyTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_longest_prefix_overrides_default(self):
+        policy = CapturePolicy(
+            {
+                "DEFAULT": {"sample_rate": 1.0, "max_bytes": 100},
+                "ROUTES": {
+                    "/api/": {"max_bytes": 50},
+                    "/api/auth/": {"sample_rate": 0.5},
+                },
+            }
+        )
+
+        self.assertEqual(
+            policy.get_rule("/api/auth/login/"), {"sample_rate": 0.5, "max_bytes": 100}
+        )
+        self.assertEqual(
+            policy.get_rule("/api/users/"), {"sample_rate": 1.0, "max_bytes": 50}
+        )
+        self.assertEqual(policy.get_rule("/admin/"), policy.default)
+
+    def test_sample_rate_bounds(self):
+        policy = CapturePolicy(
+            {
+                "DEFAULT": {"sample_rate": 1.0},
+                "ROUTES": {"/health/": {"sample_rate": 0}},
+            }
+        )
+
+        self.assertTrue(all(policy.sample("/api/") for _ in range(100)))
+        self.assertFalse(any(policy.sample("/health/") for _ in range(100)))
+
+    def capture(self, request, rule: dict) -> dict:
+        middleware = TracingMiddleware(HttpResponse)
+        with mock.patch("configurations.middleware.add_event") as add_event:
+            middleware.capture_request(mock.Mock(), request, rule)
+        return add_event.call_args.args[1]
+
+    def test_oversized_body_is_not_read(self):
+        request = self.factory.post(
+            "/api/auth/login/",
+            data=json.dumps({"username": "john", "password": "secret"}),
+            content_type="application/json",
+        )
+
+        attributes = self.capture(request, {"max_body_bytes": 10})
+
+        self.assertEqual(attributes, {"request.body.size": 42})
+        self.assertFalse(hasattr(request, "_body"))
+
+    def test_multipart_body_is_not_read(self):
+        request = self.factory.post("/api/users/", data={"avatar": "x" * 10})
+
+        attributes = self.capture(request, {})
+
+        self.assertEqual(list(attributes), ["request.body.size"])
+        self.assertFalse(hasattr(request, "_body"))
+
+    def test_small_body_is_captured(self):
+        request = self.factory.post(
+            "/api/auth/login/",
+            data=json.dumps({"username": "john"}),
+            content_type="application/json",
+        )
+
+        attributes = self.capture(request, {})
+
+        self.assertEqual(json.loads(attributes["request.body"]), {"username": "john"})
+        self.assertEqual(attributes["request.body.size"], 20)
+
+
+class SanitizeDataTests(SimpleTestCase):
+    def test_input_is_not_mutated(self):
+        data = {"user": {"password": "secret", "name": "john"}, "tokens": []}
+        snapshot = json.loads(json.dumps(data))
+
+        result = sanitize_data(data)
+
+        self.assertEqual(result["user"], {"password": "****", "name": "john"})
+        self.assertEqual(data, snapshot)
+
+    def test_unchanged_branches_are_shared(self):
+        profile = {"name": "john", "tags": ["a", "b"]}
+        items = [{"id": 1}, {"token": "abc"}]
+        data = {"profile": profile, "items": items}
+
+        result = sanitize_data(data)
+
+        self.assertIs(result["profile"], profile)
+        self.assertIsNot(result["items"], items)
+        self.assertIs(result["items"][0], items[0])
+        self.assertIs(sanitize_data(profile), profile)
+
+    def test_custom_fields_and_mask_apply_when_recursing(self):
+        data = {"card": {"number": "4242", "password": "kept"}, "items": [{"cvv": 1}]}
+
+        result = sanitize_data(data, hidden_fields=["number", "cvv"], mask_value="x")
+
+        self.assertEqual(
+            result,
+            {"card": {"number": "x", "password": "kept"}, "items": [{"cvv": "x"}]},
+        )
+
+    def test_case_sensitive(self):
+        data = {"Password": "secret", "token": "abc"}
+
+        self.assertEqual(sanitize_data(data), {"Password": "****", "token": "****"})
+        self.assertEqual(
+            sanitize_data(data, case_sensitive=True),
+            {"Password": "secret", "token": "****"},
+        )
+
+    def test_deep_search(self):
+        data = {"token": "abc", "user": {"password": "secret"}}
+
+        result = sanitize_data(data, deep_search=False)
+
+        self.assertEqual(result, {"token": "****", "user": {"password": "secret"}})
+        self.assertIs(result["user"], data["user"])
+
+
+@mock.patch.dict(os.environ, {"OTEL_EXPORTER_OTLP_ENDPOINT": "http://collector:4317"})
+class MetricsMiddlewareTests(SimpleTestCase):
+    def record(self, path: str, status: int = 200):
+        def view(request):
+            try:
+                request.resolver_match = resolve(path)
+            except Resolver404:
+                request.resolver_match = None
+            return HttpResponse(status=status)
+
+        with mock.patch("configurations.middleware.request_duration") as duration:
+            MetricsMiddleware(view)(RequestFactory().post(path))
+        value, attributes = duration.record.call_args.args
+        self.assertGreaterEqual(value, 0)
+        return attributes
+
+    def test_route_is_the_view_name(self):
+        attributes = self.record("/en/admin/user/user/42/change/", status=302)
+
+        self.assertEqual(
+            attributes,
+            {
+                "http.route": "admin_site:user_user_change",
+                "http.request.method": "POST",
+                "http.response.status_code": 302,
+            },
+        )
+
+    def test_unresolved_path_is_not_recorded(self):
+        attributes = self.record("/missing/42/", status=404)
+
+        self.assertEqual(attributes["http.route"], "")
+        self.assertEqual(attributes["http.response.status_code"], 404)
+
+
+class TaskMetricsTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        @app.task(bind=True, name="tests.flaky", max_retries=1)
+        def flaky(self, fail: bool):
+            if fail:
+                raise ValueError("task failed")
+            if not self.request.retries:
+                raise self.retry(countdown=0)
+
+        cls.task = flaky
+
+    def run_task(self, fail: bool = False) -> list:
+        with mock.patch("configurations.metrics.task_duration") as duration:
+            self.task.apply(args=(fail,))
+        for call in duration.record.call_args_list:
+            self.assertGreaterEqual(call.args[0], 0)
+        return [call.args[1] for call in duration.record.call_args_list]
+
+    def test_failure_is_recorded(self):
+        self.assertEqual(
+            self.run_task(fail=True),
+            [{"celery.task": "tests.flaky", "celery.state": "FAILURE"}],
+        )
+
+    def test_each_retry_is_recorded(self):
+        states = [attributes["celery.state"] for attributes in self.run_task()]
+
+        # Eager retries run the next attempt before the first one returns.
+        self.assertCountEqual(states, ["RETRY", "SUCCESS"])
+
+    def test_timer_is_cleared_after_recording(self):
+        request = SimpleNamespace(started_at=time.perf_counter(), published_at=None)
+        task = SimpleNamespace(name="tests.flaky", request=request)
+
+        with mock.patch("configurations.metrics.task_duration") as duration:
+            stop_task_timer(task=task, state="FAILURE")
+            stop_task_timer(task=task, state="FAILURE")
+
+        self.assertEqual(duration.record.call_count, 1)
+        self.assertIsNone(request.started_at)
+
+
+class EncodeRedactedTests(SimpleTestCase):
+    def test_masks_nested_fields(self):
+        data = {"user": {"Password": "secret"}, "results": [{"token": "abc"}]}
+
+        encoded = encode_redacted(data)
+
+        self.assertEqual(
+            json.loads(encoded),
+            {"user": {"Password": "****"}, "results": [{"token": "****"}]},
+        )
+        self.assertEqual(data["user"]["Password"], "secret")
+
+    def test_stops_at_byte_budget(self):
+        data = {"password": "secret", "name": "é" * 1000}
+
+        encoded = encode_redacted(data, max_bytes=100)
+
+        self.assertLessEqual(len(encoded), 100)
+        self.assertTrue(encoded.decode("utf-8").endswith(TRUNCATED_MARKER))
+        self.assertNotIn(b"secret", encoded)
+
+    def test_streaming_matches_encoder(self):
+        data = {"password": "secret", "items": [{"name": "é" * 10}] * 20}
+        encoded = json.dumps(sanitize_data(data), ensure_ascii=False).encode("utf-8")
+
+        for max_bytes in (50, 100, len(encoded), len(encoded) + 1):
+            with self.subTest(max_bytes=max_bytes):
+                self.assertEqual(
+                    encode_redacted(data, max_bytes, size_hint=10**6),
+                    encode_redacted(data, max_bytes),
+                )
+
+    def test_masks_fields_inside_tuples(self):
+        data = {"results": ({"token": "abc"}, [{"password": "secret"}])}
+
+        for size_hint in (None, 10**6):
+            with self.subTest(size_hint=size_hint):
+                encoded = encode_redacted(data, 1000, size_hint=size_hint)
+                self.assertEqual(
+                    json.loads(encoded),
+                    {"results": [{"token": "****"}, [{"password": "****"}]]},
+                )
+        self.assertIsInstance(sanitize_data(data)["results"], tuple)
+
+
+class ProcessThreadTests(SimpleTestCase):
+    def test_starts_once_per_process(self):
+        on_start = mock.Mock()
+        thread = ProcessThread(mock.Mock(), name="test", on_start=on_start)
+
+        with mock.patch("utils.threads.Thread") as Thread:
+            thread.ensure_started()
+            thread.ensure_started()
+            with mock.patch("utils.threads.os.getpid", return_value=-1):
+                thread.ensure_started()
+
+        self.assertEqual(Thread.return_value.start.call_count, 2)
+        self.assertEqual(on_start.call_count, 2)
+        self.assertEqual(thread.pid, -1)
+
+
+class EventQueueTests(SimpleTestCase):
+    def setUp(self):
+        self.tracer = TracerProvider().get_tracer(__name__)
+        self.queue = EventQueue(max_size=2)
+        # Drain on the test thread instead of the background worker.
+        self.queue._worker.pid = os.getpid()
+
+    def test_attaches_events_and_drops_when_full(self):
+        with self.tracer.start_as_current_span("request") as span:
+            for index in range(3):
+                self.queue.put(span, "log", lambda index: {"index": index}, index)
+            self.queue.drain()
+
+        self.assertEqual([event.attributes["index"] for event in span.events], [0, 1])
+        self.assertEqual(self.queue.counters["dropped"], 1)
+
+    def test_counters_are_exported(self):
+        with mock.patch("configurations.events.span_event_queue") as metric:
+            with self.tracer.start_as_current_span("request") as span:
+                for index in range(3):
+                    self.queue.put(span, "log", lambda: {"message": "log"})
+                self.queue.drain()
+
+        results = [call.args[1]["result"] for call in metric.add.call_args_list]
+        self.assertEqual(results.count("queued"), 2)
+        self.assertEqual(results.count("dropped"), 1)
+        self.assertEqual(results.count("attached"), 2)
+
+    def test_drops_events_of_ended_spans(self):
+        with self.tracer.start_as_current_span("request") as span:
+            self.queue.put(span, "log", lambda: {"message": "late"})
+        self.queue.drain()
+
+        self.assertEqual(len(span.events), 0)
+        self.assertEqual(self.queue.counters["late"], 1)
+
+
+class SamplingTests(SimpleTestCase):
+    config = {
+        "DEFAULT": {"ratio": 1.0},
+        "ROUTES": {
+            "/api/users/my-profile/": {"ratio": 0.0, "methods": ["GET"]},
+            "/api/auth/login/": {"ratio": 0.0, "tail": True, "latency_ms": 1000},
+        },
+    }
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.processor = TailSamplingSpanProcessor(SimpleSpanProcessor(self.exporter))
+        provider = TracerProvider(sampler=get_sampler(self.config))
+        provider.add_span_processor(self.processor)
+        self.tracer = provider.get_tracer(__name__)
+
+    def request(self, method, path, error=False):
+        attributes = {"http.method": method, "http.target": path}
+        with self.tracer.start_as_current_span("request", attributes=attributes):
+            with self.tracer.start_as_current_span("query") as span:
+                if error:
+                    span.set_status(StatusCode.ERROR)
+
+    def test_route_ratio_overrides_default(self):
+        self.request("GET", "/api/users/my-profile/?page=2")
+        self.request("PATCH", "/api/users/my-profile/")
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 2)
+        self.assertEqual(spans[1].attributes["http.method"], "PATCH")
+
+    def test_tail_keeps_only_failed_traces(self):
+        self.request("POST", "/api/auth/login/")
+        self.request("POST", "/api/auth/login/", error=True)
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual([span.name for span in spans], ["query", "request"])
+        self.assertTrue(all(span.context.trace_flags.sampled for span in spans))
+        self.assertEqual(spans[0].parent.span_id, spans[1].context.span_id)
+        self.assertEqual(self.processor.counters["dropped"], 1)
+        self.assertEqual(self.processor.counters["kept"], 1)
+
+    def test_evicted_candidates_are_dropped(self):
+        processor = TailSamplingSpanProcessor(
+            SimpleSpanProcessor(self.exporter), max_traces=1
+        )
+        provider = TracerProvider(sampler=get_sampler(self.config))
+        provider.add_span_processor(processor)
+        tracer = provider.get_tracer(__name__)
+        attributes = {"http.method": "POST", "http.target": "/api/auth/login/"}
+
+        evicted = tracer.start_span("evicted", attributes=attributes)
+        kept = tracer.start_span("kept", attributes=attributes)
+        for span in (evicted, kept):
+            span.set_status(StatusCode.ERROR)
+            span.end()
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual([span.name for span in spans], ["kept"])
+        self.assertEqual(processor.counters, {"kept": 1, "dropped": 1, "evicted": 1})
+
+    def test_tail_candidates_propagate_as_not_sampled(self):
+        attributes = {"http.method": "POST", "http.target": "/api/auth/login/"}
+        with self.tracer.start_as_current_span("request", attributes=attributes):
+            with self.tracer.start_as_current_span("query") as span:
+                self.assertTrue(span.is_recording())
+                headers = {}
+                TraceContextTextMapPropagator().inject(headers)
+
+        self.assertTrue(headers["traceparent"].endswith("-00"))
+        self.assertIn("tail=1", headers["tracestate"])
+
+
+class SheddingSpanProcessorTests(SimpleTestCase):
+    def setUp(self):
+        self.processor = SheddingSpanProcessor(
+            InMemorySpanExporter(),
+            max_queue_size=4,
+            shed_ratio=0.5,
+            max_export_batch_size=4,
+        )
+        # Stand in for the export queue so its size is under test control.
+        self.processor._batch_processor.shutdown()
+        self.queue = []
+        self.processor._batch_processor = SimpleNamespace(
+            _queue=self.queue, emit=self.queue.append, shutdown=lambda: None
+        )
+        provider = TracerProvider()
+        provider.add_span_processor(self.processor)
+        self.tracer = provider.get_tracer(__name__)
+
+    def test_sheds_events_before_spans(self):
+        for index in range(5):
+            with self.tracer.start_as_current_span(f"span-{index}") as span:
+                span.add_event("log", {"index": index})
+
+        self.assertEqual(
+            [span.name for span in self.queue], [f"span-{i}" for i in range(4)]
+        )
+        self.assertEqual([len(span.events) for span in self.queue], [1, 1, 0, 0])
+        self.assertEqual(self.queue[2].attributes[DROPPED_EVENTS], 1)
+
+    def test_exports_without_shedding_when_queue_is_missing(self):
+        self.processor._batch_processor = SimpleNamespace(
+            emit=self.queue.append, shutdown=lambda: None
+        )
+        for index in range(5):
+            with self.tracer.start_as_current_span(f"span-{index}") as span:
+                span.add_event("log", {"index": index})
+
+        self.assertEqual(len(self.queue), 5)
+        self.assertTrue(all(len(span.events) == 1 for span in self.queue))
+
+
+class StartupTests(SimpleTestCase):
+    def assertNotImported(self, code, modules):
+        env = {**os.environ}
+        env.pop("OTEL_EXPORTER_OTLP_ENDPOINT", None)
+        check = (
+            f"{code}; import sys; print(*(m for m in {modules!r} if m in sys.modules))"
+        )
+        process = subprocess.run(
+            [sys.executable, "-c", check],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        )
+        self.assertEqual(process.stdout.splitlines()[-1], "")
+
+    def test_wsgi_skips_telemetry_when_disabled(self):
+        self.assertNotImported(
+            "import configurations.wsgi",
+            ["grpc", "opentelemetry.sdk.trace", "opentelemetry.instrumentation"],
+        )
+
+    def test_celery_worker_skips_telemetry_when_disabled(self):
+        self.assertNotImported(
+            "import configurations.celery as app; app.worker_init()",
+            ["grpc", "opentelemetry.sdk.trace", "opentelemetry.instrumentation"],
+        )
+
+
+class QueryBudgetTests(TestCase):
+    def test_flags_repeated_statements(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "repeated 5 times"):
+            with query_budget(n_plus_one=5):
+                for pk in range(5):
+                    User.objects.filter(pk=pk).exists()
+
+    def test_counts_within_budget(self):
+        with query_budget(2) as counter:
+            User.objects.exists()
+            User.objects.count()
+
+        self.assertEqual(counter.count, 2)
+        self.assertGreater(counter.duration, 0)
+
+    def test_budget_keys_are_view_names(self):
+        match = resolve(reverse("admin_site:admin_password_reset"))
+
+        self.assertIn(match.view_name, settings.QUERY_BUDGET["VIEWS"])
+        self.assertFalse(settings.QUERY_BUDGET["RAISE"])
+
+    def view(self, request):
+        User.objects.exists()
+        return HttpResponse()
+
+    def test_reports_queries_in_server_timing(self):
+        request = RequestFactory().get("/api/users/my-profile/")
+        response = QueryBudgetMiddleware(self.view)(request)
+
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="1 queries"')
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        request = RequestFactory().get("/api/users/my-profile/")
+        response = QueryBudgetMiddleware(self.view)(request)
+
+        self.assertFalse(response.has_header("Server-Timing"))
+
+
+class ServerTimingTests(SimpleTestCase):
+    def view(self, request):
+        with timed("template"):
+            pass
+        with timed("template"):
+            pass
+        return HttpResponse()
+
+    def test_timed_is_noop_outside_request(self):
+        self.assertIs(timed("template"), NOOP)
+
+    def test_reports_phases(self):
+        request = RequestFactory().get("/api/users/my-profile/")
+        response = ServerTimingMiddleware(self.view)(request)
+
+        self.assertRegex(response["Server-Timing"], r'template;dur=[\d.]+;desc="2x"')
+        self.assertIn("app;dur=", response["Server-Timing"])
+        self.assertIs(timed("template"), NOOP)
+
+
+class StructuredLoggingTests(SimpleTestCase):
+    def setUp(self):
+        self.tracer = TracerProvider().get_tracer(__name__)
+        self.record = logging.LogRecord(
+            "core.common.tasks", logging.INFO, __file__, 1, "sent %s", ("otp",), None
+        )
+
+    def test_formats_trace_ids(self):
+        with self.tracer.start_as_current_span("request") as span:
+            line = json.loads(JSONFormatter().format(self.record))
+
+        self.assertEqual(line["message"], "sent otp")
+        self.assertEqual(line["trace_id"], f"{span.get_span_context().trace_id:032x}")
+
+    def test_task_inherits_publisher_trace(self):
+        headers = {}
+        with self.tracer.start_as_current_span("request") as span:
+            stamp_trace_context(headers=headers)
+
+        trace_id = f"{span.get_span_context().trace_id:032x}"
+        self.assertEqual(headers["trace_id"], trace_id)
+        self.assertIn(trace_id, headers["traceparent"])
+
+        token = log_context.set({"trace_id": headers["trace_id"]})
+        try:
+            line = json.loads(JSONFormatter().format(self.record))
+        finally:
+            log_context.reset(token)
+        self.assertEqual(line["trace_id"], trace_id)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DashboardSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Drop the anonymous user django-guardian creates on migrate.
+        User.objects.all().delete()
+        self.today = timezone.localdate()
+
+    def at(self, days_ago: int):
+        return start_of_day(self.today - timedelta(days=days_ago)) + timedelta(hours=12)
+
+    def seed(self, days_ago: int, count: int = 1):
+        for _ in range(count):
+            user = User.objects.create(
+                username=f"user-{User.objects.count()}", date_joined=self.at(days_ago)
+            )
+            otp = OtpCode.objects.create(
+                user=user,
+                code="123456",
+                type_otp=OtpTypeEnum.EMAIL,
+                expires_at=self.at(days_ago),
+                verified_at=self.at(days_ago),
+            )
+            OtpCode.objects.filter(pk=otp.pk).update(created_at=self.at(days_ago))
+            OutstandingToken.objects.create(
+                user=user,
+                jti=f"jti-{user.pk}",
+                token="token",
+                created_at=self.at(days_ago),
+                expires_at=self.at(days_ago),
+            )
+
+    def test_series_cover_the_window(self):
+        self.seed(0, 2)
+        self.seed(DASHBOARD_SNAPSHOT_DAYS - 1)
+        self.seed(DASHBOARD_SNAPSHOT_DAYS)
+
+        snapshot = build_snapshot()
+
+        self.assertEqual(len(snapshot["dates"]), DASHBOARD_SNAPSHOT_DAYS)
+        self.assertEqual(snapshot["dates"][-1], self.today.isoformat())
+        for name, series in snapshot["series"].items():
+            with self.subTest(series=name):
+                self.assertEqual(len(series), DASHBOARD_SNAPSHOT_DAYS)
+                self.assertEqual((series[0], series[-1], sum(series)), (1, 2, 3))
+        self.assertEqual(snapshot["totals"]["users"], 4)
+
+    def test_snapshot_is_cached(self):
+        first = get_snapshot()
+        self.seed(0)
+
+        self.assertEqual(get_snapshot(), first)
+
+    def test_week_over_week_kpi(self):
+        self.seed(1, 3)
+        self.seed(8, 2)
+
+        kpi = dashboard_data(RequestFactory().get("/admin/"))["kpi"]
+
+        self.assertEqual(kpi[0]["metric"], "3")
+        self.assertIn("+50.00%", kpi[0]["footer"])
+        self.assertIn("text-green-700", kpi[0]["footer"])
+
+    def test_kpi_without_previous_week(self):
+        self.seed(1)
+
+        kpi = dashboard_data(RequestFactory().get("/admin/"))["kpi"]
+
+        self.assertEqual(kpi[0]["footer"], "No data for the previous week")
+
+    @mock.patch("core.user.tasks.config", SimpleNamespace(OTP_CODE_RETENTION_DAYS=7))
+    def test_purging_otp_codes_keeps_the_series(self):
+        self.seed(DASHBOARD_SNAPSHOT_DAYS - 1)
+        self.seed(DASHBOARD_SNAPSHOT_DAYS + 1)
+        before = build_snapshot()["series"]
+
+        purge_otp_codes()
+
+        self.assertEqual(OtpCode.objects.count(), 1)
+        series = build_snapshot()["series"]
+        self.assertEqual(series["otp_sent"], before["otp_sent"])
+        self.assertEqual(series["otp_verified"], before["otp_verified"])
+        self.assertEqual(sum(series["otp_sent"]), 1)
+
+    def test_purging_tokens_keeps_the_series(self):
+        self.seed(DASHBOARD_SNAPSHOT_DAYS - 1)
+        self.seed(DASHBOARD_SNAPSHOT_DAYS + 1)
+        before = build_snapshot()["series"]["tokens_issued"]
+
+        purge_expired_tokens()
+
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertEqual(build_snapshot()["series"]["tokens_issued"], before)
+        self.assertEqual(sum(before), 1)
+
+
+class RefreshCohortsTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.cohort = self.today - timedelta(days=3)
+        joined = start_of_day(self.cohort) + timedelta(hours=12)
+        for username, last_login in (
+            ("john", start_of_day(self.today - timedelta(days=1))),
+            ("jane", None),
+        ):
+            User.objects.create(
+                username=username,
+                email=f"{username}@example.com",
+                date_joined=joined,
+                last_login=last_login,
+            )
+
+    def cells(self) -> dict:
+        return {
+            (cohort, day): users
+            for cohort, day, users in CohortRetention.objects.values_list(
+                "cohort", "day", "users"
+            )
+        }
+
+    def test_first_run_backfills_recent_days(self):
+        created = refresh_cohorts()
+
+        cells = self.cells()
+        # A size row for every day, plus the later offsets of the cohort.
+        self.assertEqual(created, COHORT_DAYS + 2)
+        self.assertEqual(len(cells), created)
+        self.assertEqual(cells[self.cohort, 0], 2)
+        self.assertEqual(cells[self.cohort, 1], 1)
+        self.assertEqual(cells[self.cohort, 2], 1)
+        self.assertEqual(cells[self.today - timedelta(days=1), 0], 0)
+        self.assertNotIn((self.today, 0), cells)
+
+    def test_rerun_on_the_same_day_is_a_noop(self):
+        refresh_cohorts()
+
+        self.assertEqual(refresh_cohorts(), 0)
+        self.assertEqual(materialize_cohorts(self.today - timedelta(days=1)), 0)
+        self.assertEqual(CohortRetention.objects.count(), COHORT_DAYS + 2)
+
+    def test_missed_days_are_caught_up(self):
+        with mock.patch(
+            "django.utils.timezone.localdate",
+            return_value=self.today - timedelta(days=2),
+        ):
+            refresh_cohorts()
+        self.assertNotIn((self.cohort, 1), self.cells())
+
+        created = refresh_cohorts()
+
+        cells = self.cells()
+        self.assertEqual(created, 4)
+        self.assertEqual(cells[self.cohort, 1], 1)
+        self.assertEqual(cells[self.cohort, 2], 1)
+        self.assertEqual(cells[self.today - timedelta(days=1), 0], 0)
+
+
+class PurgeExpiredTokensTests(TestCase):
+    def test_deletes_expired_tokens_and_blacklist(self):
+        user = User.objects.create(username="john", email="john@example.com")
+        now = timezone.now()
+        expired = -DASHBOARD_SNAPSHOT_DAYS
+        for jti, days in (("a", expired - 2), ("b", expired - 1), ("c", -1)):
+            token = OutstandingToken.objects.create(
+                user=user,
+                jti=jti,
+                token=jti,
+                created_at=now,
+                expires_at=now + timedelta(days=days),
+            )
+            BlacklistedToken.objects.create(token=token)
+
+        stdout = StringIO()
+        call_command("purge_expired_tokens", batch_size=1, pause=0, stdout=stdout)
+
+        self.assertIn("Deleted 4 token rows", stdout.getvalue())
+        self.assertQuerySetEqual(
+            OutstandingToken.objects.values_list("jti", flat=True), ["c"]
+        )
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for x in range(1000):
+            bloom.add(f"jti-{x}")
+
+        self.assertTrue(all(f"jti-{x}" in bloom for x in range(1000)))
+        false_positives = sum(f"other-{x}" in bloom for x in range(10000))
+        self.assertLess(false_positives, 300)
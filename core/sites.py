@@ -1,14 +1,19 @@
-from typing import Any, Dict, List, Optional
+from itertools import product
+from threading import Lock
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
 
 from constance import config
 from django.conf import settings
 from django.contrib.auth.decorators import login_not_required
+from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth.views import (
     PasswordResetCompleteView,
     PasswordResetConfirmView,
     PasswordResetDoneView,
     PasswordResetView,
 )
+from django.core.cache import cache
 from django.core.validators import EMPTY_VALUES
 from django.http import (
     HttpRequest,
@@ -18,14 +23,17 @@ from django.http import (
 from django.shortcuts import render
 from django.urls import URLPattern, path, reverse
 from django.utils.decorators import method_decorator
+from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.cache import never_cache
 from rest_framework import status
 from rest_framework.exceptions import PermissionDenied, ParseError, NotFound
+from rest_framework.views import set_rollback
 from unfold.sites import UnfoldAdminSite
 
 from common.exceptions import DefaultException, exception_handler
 from controllers.admin.forms import AdminPasswordResetForm, AdminSetPasswordForm
+from core.common.constance import get_values
 
 
 MESSAGE_ERROR = {
@@ -53,6 +61,8 @@ EXCEPTION_CLASS = {
     status.HTTP_403_FORBIDDEN: PermissionDenied(),
     status.HTTP_404_NOT_FOUND: NotFound(),
 }
+UNFOLD_CONTEXT_VERSION_KEY = "constance:unfold_context:version"
+ERROR_PAGES_MAX_SIZE = 64
 
 
 def convert_to_dict(
@@ -78,13 +88,13 @@ def convert_to_dict(
         result[key] = value
 
 
-def convert_config(config, config_names: list):
+def convert_config(values: dict, config_names: list):
     result = {}
 
     for key in config_names:
         attr_name = key.upper()
-        if hasattr(config, attr_name):
-            value = getattr(config, attr_name)
+        if attr_name in values:
+            value = values[attr_name]
             if value not in EMPTY_VALUES and value != settings.CONSTANCE_DEFAULT_VALUE:
                 parts = key.split("__")
                 convert_to_dict(
@@ -98,7 +108,7 @@ def convert_config(config, config_names: list):
     return result
 
 
-def callback_constance(config) -> dict:
+def callback_constance(values: dict) -> dict:
     from utils.performs import get_class_from_string
 
     result = {}
@@ -110,9 +120,9 @@ def callback_constance(config) -> dict:
         key = item["field"].lower()
         attr_name = item["field"].upper()
 
-        if not hasattr(config, attr_name):
+        if attr_name not in values:
             continue
-        data_of_field = getattr(config, attr_name)
+        data_of_field = values[attr_name]
 
         value = Subclass(
             field=item["field"].upper(),
@@ -132,6 +142,103 @@ def callback_constance(config) -> dict:
     return result
 
 
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    return value
+
+
+class PaletteRegistry:
+    """
+    Read-only `callback_constance` results for every combination of choices.
+
+    All fragments are computed once at startup, so resolving the palettes for
+    the current Constance values is a single dict lookup returning a shared
+    mapping.
+    """
+
+    def __init__(self, callbacks: list):
+        self._choices = {}
+        for item in callbacks:
+            field, meta_data = item.get("field"), item.get("meta_data")
+            if isinstance(field, str) and isinstance(meta_data, dict):
+                # `None` stands for any value that is not a known choice.
+                self._choices[field.upper()] = (*meta_data.keys(), None)
+
+        self._fragments = {}
+        for key in product(*self._choices.values()):
+            values = dict(zip(self._choices, key))
+            self._fragments[key] = freeze(callback_constance(values))
+
+    def get_key(self, values: dict) -> tuple:
+        return tuple(
+            values.get(field) if values.get(field) in choices else None
+            for field, choices in self._choices.items()
+        )
+
+    def lookup(self, values: dict) -> Mapping:
+        if not self._choices.keys() <= values.keys():
+            # callback_constance skips absent fields, only complete reads
+            # are precomputed.
+            return freeze(callback_constance(values))
+        return self._fragments[self.get_key(values)]
+
+
+class UnfoldContext:
+    """
+    Per-process snapshot of the Unfold context derived from Constance.
+
+    Building the context costs one Redis round trip per Constance key, so the
+    result is kept in memory and only rebuilt when the shared version key
+    stored in the cache changes. The key is bumped on `config_updated`, which
+    lets every worker notice the change with a single GET per render.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._context = None
+
+    @property
+    def fields(self) -> set:
+        fields = {key.lower() for key in settings.CONSTANCE_CONFIG_FOR_UNFOLD}
+        for item in settings.CONSTANCE_CALLBACKS_UNFOLD:
+            if isinstance(item.get("field"), str):
+                fields.add(item["field"].lower())
+        return fields
+
+    def get_version(self) -> int:
+        return cache.get(UNFOLD_CONTEXT_VERSION_KEY, 0)
+
+    def get(self) -> dict:
+        version = self.get_version()
+        context = self._context
+        if context is not None and self._version == version:
+            return context
+
+        with self._lock:
+            if self._context is None or self._version != version:
+                # Other processes may not have evicted the changed key from
+                # their local Constance cache yet when they see the new version.
+                keys = [key.upper() for key in self.fields]
+                values = get_values(config, keys, fresh=True)
+                self._context = {
+                    **convert_config(values, settings.CONSTANCE_CONFIG_FOR_UNFOLD),
+                    **palette_registry.lookup(values),
+                }
+                self._version = version
+            return self._context
+
+    def invalidate(self):
+        self._context = None
+        cache.add(UNFOLD_CONTEXT_VERSION_KEY, 0, timeout=None)
+        cache.incr(UNFOLD_CONTEXT_VERSION_KEY)
+
+
+palette_registry = PaletteRegistry(settings.CONSTANCE_CALLBACKS_UNFOLD)
+unfold_context = UnfoldContext()
+
+
 class AdminSite(UnfoldAdminSite):
     password_reset_form_template = "admin/password_reset/form.html"
     password_reset_email_template = "admin/password_reset/email.html"
@@ -141,14 +248,16 @@ class AdminSite(UnfoldAdminSite):
     password_reset_subject_template = "admin/password_reset/subject.html"
     error_templates = "admin/handlers/error.html"
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._error_pages = {}
+        self._json_errors = {}
+
     def each_context(self, request: HttpRequest) -> dict[str, Any]:
         context = super().each_context(request)
-        update_context = convert_config(config, settings.CONSTANCE_CONFIG_FOR_UNFOLD)
-        update_context_callback = callback_constance(config)
+        update_context = unfold_context.get()
         if bool(update_context):
             context = {**context, **update_context}
-        if bool(update_context_callback):
-            context = {**context, **update_context_callback}
         return context
 
     def get_urls(self) -> List[URLPattern]:
@@ -176,13 +285,39 @@ class AdminSite(UnfoldAdminSite):
         ] + super().get_urls()
         return urlpatterns
 
+    def _json_handler(self, status_code: int) -> HttpResponse:
+        key = (status_code, get_language())
+        content = self._json_errors.get(key)
+        if content is None:
+            message = MESSAGE_ERROR.get(status_code, "")
+            exc = EXCEPTION_CLASS.get(status_code) or DefaultException(message)
+            content = exception_handler(exc, None).content
+            self._json_errors[key] = content
+        set_rollback()
+        return HttpResponse(
+            content,
+            status=status_code,
+            content_type="application/json",
+        )
+
     def _render_handler(self, request, status_code, *args, **kwargs):
         content_type = request.META.get("CONTENT_TYPE")
         path = request.META.get("PATH_INFO", "")
-        message = MESSAGE_ERROR.get(status_code, "")
         if content_type == "application/json" or path.startswith("/api/"):
-            exc = EXCEPTION_CLASS.get(status_code, DefaultException(message))
-            return exception_handler(exc, None)
+            return self._json_handler(status_code)
+
+        # Errors raised before AuthenticationMiddleware have no user attached.
+        if not hasattr(request, "user"):
+            request.user = AnonymousUser()
+
+        # Pages rendered for anonymous users only vary by language and theme.
+        key = None
+        if not request.user.is_authenticated:
+            key = (status_code, get_language(), unfold_context.get_version())
+            content = self._error_pages.get(key)
+            if content is not None:
+                return HttpResponse(content, status=status_code)
+
         context = self.each_context(request)
         context.update(
             {
@@ -198,12 +333,17 @@ class AdminSite(UnfoldAdminSite):
                 },
             }
         )
-        return render(
+        response = render(
             request,
             self.error_templates,
             context=context,
             status=status_code,
         )
+        if key is not None:
+            if len(self._error_pages) >= ERROR_PAGES_MAX_SIZE:
+                self._error_pages.clear()
+            self._error_pages[key] = response.content
+        return response
 
     @method_decorator(never_cache)
     @login_not_required
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="otpcode",
+            name="verified_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Verified At"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0003_user_user_date_joined_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="otpcode",
+            index=models.Index(
+                fields=["user", "type_otp", "is_used", "created_at"],
+                name="otpcode_user_type_used_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="otpcode",
+            index=models.Index(
+                condition=models.Q(("is_used", False)),
+                fields=["user", "type_otp", "created_at"],
+                name="otpcode_active_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0004_otpcode_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="otpcode",
+            index=models.Index(fields=["expires_at"], name="otpcode_expires_at_idx"),
+        ),
+    ]
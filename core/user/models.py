@@ -16,6 +16,11 @@ from core.user.enums import OTPVerificationStatusEnum, OtpTypeEnum
 
 
 class User(AbstractUser):
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=["date_joined"], name="user_date_joined_idx"),
+        ]
+
     @property
     def full_name(self):
         full_name = []
@@ -62,6 +67,26 @@ class OtpCode(BaseModel):
         verbose_name=_("Expires At"),
     )
     is_used = models.BooleanField(verbose_name=_("Is Used"), default=False)
+    verified_at = models.DateTimeField(
+        verbose_name=_("Verified At"),
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "type_otp", "is_used", "created_at"],
+                name="otpcode_user_type_used_idx",
+            ),
+            # Only the active code of each (user, type) is ever looked up
+            models.Index(
+                fields=["user", "type_otp", "created_at"],
+                condition=models.Q(is_used=False),
+                name="otpcode_active_idx",
+            ),
+            models.Index(fields=["expires_at"], name="otpcode_expires_at_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.code} ({self.type_otp})"
@@ -85,7 +110,8 @@ class OtpCode(BaseModel):
         if self.is_expired:
             return OTPVerificationStatusEnum.EXPIRED
         self.is_used = True
-        self.save(update_fields=["is_used"])
+        self.verified_at = timezone.now()
+        self.save(update_fields=["is_used", "verified_at"])
         return OTPVerificationStatusEnum.VERIFIED
 
 
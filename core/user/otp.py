@@ -0,0 +1,156 @@
+import hashlib
+import hmac
+import logging
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from configurations.metrics import redis_calls
+from core.user.enums import OTPVerificationStatusEnum
+from core.user.models import OtpCode, User
+from core.user.tasks import audit_otp_task
+from utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+OTP_KEY = "otp:{type_otp}:{user_id}"
+
+# Delete the active code only if its digest matches, so a code is consumed
+# once even when two verifications race. Returns the stored "digest:expiry".
+CONSUME_SCRIPT = """
+local stored = redis.call("GET", KEYS[1])
+local prefix = ARGV[1] .. ":"
+if not stored or string.sub(stored, 1, #prefix) ~= prefix then
+    return false
+end
+redis.call("DEL", KEYS[1])
+return stored
+"""
+
+
+class OtpStore:
+    """
+    Storage engine of the active OTP code of each (user, type).
+
+    Issuing a code replaces the previous one, verifying a valid code
+    consumes it.
+    """
+
+    def issue(self, user: User, type_otp: str, code: str, timeout: int):
+        raise NotImplementedError
+
+    def verify(self, user: User, type_otp: str, code: str) -> str:
+        """
+        Returns:
+            An OTPVerificationStatusEnum value
+        """
+        raise NotImplementedError
+
+
+class DatabaseOtpStore(OtpStore):
+    """
+    Keep every code as an OtpCode row.
+    """
+
+    def issue(self, user: User, type_otp: str, code: str, timeout: int):
+        OtpCode.objects.filter(
+            user=user,
+            type_otp=type_otp,
+            is_used=False,
+        ).update(is_used=True)
+        OtpCode.objects.create(
+            user=user,
+            code=code,
+            type_otp=type_otp,
+            expires_at=timezone.now() + timedelta(seconds=timeout),
+        )
+
+    def verify(self, user: User, type_otp: str, code: str) -> str:
+        try:
+            otp_instance = OtpCode.objects.filter(
+                user=user,
+                code=code,
+                type_otp=type_otp,
+                is_used=False,
+            ).latest("-created_at")
+        except OtpCode.DoesNotExist:
+            return OTPVerificationStatusEnum.INVALID
+
+        if otp_instance.is_expired:
+            return OTPVerificationStatusEnum.EXPIRED
+
+        otp_instance.is_used = True
+        otp_instance.verified_at = timezone.now()
+        otp_instance.save(update_fields=["is_used", "verified_at", "updated_at"])
+        return OTPVerificationStatusEnum.VERIFIED
+
+
+class RedisOtpStore(OtpStore):
+    """
+    Keep one keyed hash of the active code per (user, type) in Redis.
+
+    The key expires with the code, so there is nothing to invalidate or clean
+    up, and issuing and verifying are one round trip each whatever the OTP
+    history of the user. An expired code is reported as invalid. With
+    `OTP_STORE["AUDIT"]` every issued and verified code is also recorded as an
+    OtpCode row, without the code, by a Celery task.
+    """
+
+    def __init__(self):
+        self.consume = get_redis().register_script(CONSUME_SCRIPT)
+
+    @staticmethod
+    def get_key(user: User, type_otp: str) -> str:
+        return OTP_KEY.format(type_otp=type_otp, user_id=user.pk)
+
+    @staticmethod
+    def get_digest(user: User, type_otp: str, code: str) -> str:
+        message = f"{user.pk}:{type_otp}:{code}".encode()
+        return hmac.new(
+            settings.SECRET_KEY.encode(), message, hashlib.sha256
+        ).hexdigest()
+
+    def issue(self, user: User, type_otp: str, code: str, timeout: int):
+        # The expiry identifies the code in the audit rows.
+        expires_at = time.time() + timeout
+        redis_calls.add(1, {"operation": "otp.issue"})
+        get_redis().set(
+            self.get_key(user, type_otp),
+            f"{self.get_digest(user, type_otp, code)}:{expires_at!r}",
+            ex=timeout,
+        )
+        self.audit(user, type_otp, expires_at=expires_at)
+
+    def verify(self, user: User, type_otp: str, code: str) -> str:
+        redis_calls.add(1, {"operation": "otp.verify"})
+        consumed = self.consume(
+            keys=[self.get_key(user, type_otp)],
+            args=[self.get_digest(user, type_otp, code)],
+        )
+        if not consumed:
+            return OTPVerificationStatusEnum.INVALID
+        expires_at = float(consumed.rsplit(b":", 1)[1])
+        self.audit(user, type_otp, expires_at=expires_at, verified_at=time.time())
+        return OTPVerificationStatusEnum.VERIFIED
+
+    @staticmethod
+    def audit(user: User, type_otp: str, **kwargs):
+        if not settings.OTP_STORE["AUDIT"]:
+            return
+        try:
+            audit_otp_task.delay(user_id=user.pk, type_otp=type_otp, **kwargs)
+        except Exception as e:
+            logger.warning(f"Failed to audit {type_otp} OTP of user {user.pk}: {e}")
+
+
+@lru_cache
+def load_otp_store(backend: str) -> OtpStore:
+    return import_string(backend)()
+
+
+def get_otp_store() -> OtpStore:
+    return load_otp_store(settings.OTP_STORE["BACKEND"])
@@ -0,0 +1,70 @@
+import logging
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from constance import config
+from django.conf import settings
+from django.utils import timezone
+
+from configurations.celery import app
+from core.common.dashboard import DASHBOARD_SNAPSHOT_DAYS
+from core.user.models import OtpCode
+from utils.db import delete_in_chunks
+
+logger = logging.getLogger(__name__)
+
+# Audit rows never hold the code itself, only that one was issued or used.
+MASKED_CODE = "******"
+
+
+@app.task(name="audit_otp_task", ignore_result=True)
+def audit_otp_task(user_id, type_otp, expires_at, verified_at=None):
+    """
+    Record an OTP issued or verified through RedisOtpStore as an OtpCode row.
+
+    A code is identified by its expiry timestamp, so the row ends up the same
+    whichever of the issue and verify tasks of a code runs first, and a code
+    only replaces the codes that expire before it.
+    """
+    codes = OtpCode.objects.filter(user_id=user_id, type_otp=type_otp)
+    expires_at = datetime.fromtimestamp(expires_at, tz=dt_timezone.utc)
+    if verified_at is not None:
+        verified_at = datetime.fromtimestamp(verified_at, tz=dt_timezone.utc)
+        found = codes.filter(expires_at=expires_at).update(
+            is_used=True, verified_at=verified_at
+        )
+    else:
+        found = codes.filter(expires_at=expires_at).exists()
+
+    if not found:
+        OtpCode.objects.create(
+            user_id=user_id,
+            code=MASKED_CODE,
+            type_otp=type_otp,
+            expires_at=expires_at,
+            is_used=(
+                verified_at is not None
+                or codes.filter(expires_at__gt=expires_at).exists()
+            ),
+            verified_at=verified_at,
+        )
+    codes.filter(is_used=False, expires_at__lt=expires_at).update(is_used=True)
+
+
+@app.task(name="purge_otp_codes", ignore_result=True)
+def purge_otp_codes():
+    """
+    Delete OTP codes that expired more than OTP_CODE_RETENTION_DAYS ago.
+
+    Codes are kept at least for the dashboard window, the OTP series of the
+    snapshot are counted from them.
+    """
+    days = max(config.OTP_CODE_RETENTION_DAYS, DASHBOARD_SNAPSHOT_DAYS)
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = delete_in_chunks(
+        OtpCode.objects.filter(expires_at__lt=cutoff),
+        batch_size=settings.CLEANUP["BATCH_SIZE"],
+        pause=settings.CLEANUP["PAUSE_SECONDS"],
+        max_seconds=settings.CLEANUP["MAX_SECONDS"],
+    )
+    logger.info(f"Purged {deleted} OTP codes expired before {cutoff}")
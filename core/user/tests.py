@@ -0,0 +1,349 @@
+import os
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from configurations.queries import QueryBudgetExceeded
+from core.common.dashboard import build_snapshot
+from core.common.tests import FakeRedis
+from core.user.enums import OtpTypeEnum, OTPVerificationStatusEnum
+from core.user.models import OtpCode, User
+from core.user.otp import DatabaseOtpStore, RedisOtpStore
+from core.user.tasks import MASKED_CODE, audit_otp_task
+from core.user.tokens import (
+    RefreshToken,
+    get_token_blacklist,
+    load_token_blacklist,
+)
+from utils.db import delete_in_chunks
+
+QUERY_BUDGET = {
+    "DEFAULT": None,
+    "VIEWS": {"register": 6},
+    "N_PLUS_ONE_THRESHOLD": 5,
+    "RAISE": True,
+}
+
+
+@override_settings(QUERY_BUDGET=QUERY_BUDGET)
+class RegisterQueryBudgetTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch("core.common.activity.get_redis", return_value=FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def register(self):
+        return self.client.post(
+            "/api/auth/register/",
+            {"email": "john.doe@example.com"},
+            content_type="application/json",
+        )
+
+    def test_register_within_budget(self):
+        response = self.register()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("db;dur=", response["Server-Timing"])
+
+    def test_exceeding_budget_fails(self):
+        budget = {**QUERY_BUDGET, "VIEWS": {"register": 1}}
+        with override_settings(QUERY_BUDGET=budget):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.register()
+
+
+class DatabaseOtpStoreTests(TestCase):
+    def setUp(self):
+        self.store = DatabaseOtpStore()
+        self.user = User.objects.create(username="john", email="john@example.com")
+
+    def test_code_is_consumed_once(self):
+        self.store.issue(self.user, OtpTypeEnum.EMAIL, "123456", timeout=600)
+
+        self.assertEqual(
+            self.store.verify(self.user, OtpTypeEnum.EMAIL, "123456"),
+            OTPVerificationStatusEnum.VERIFIED,
+        )
+        self.assertEqual(
+            self.store.verify(self.user, OtpTypeEnum.EMAIL, "123456"),
+            OTPVerificationStatusEnum.INVALID,
+        )
+
+    def test_issue_replaces_active_code(self):
+        self.store.issue(self.user, OtpTypeEnum.EMAIL, "123456", timeout=600)
+        self.store.issue(self.user, OtpTypeEnum.EMAIL, "654321", timeout=600)
+
+        self.assertEqual(
+            self.store.verify(self.user, OtpTypeEnum.EMAIL, "123456"),
+            OTPVerificationStatusEnum.INVALID,
+        )
+
+    def test_issue_keeps_used_codes(self):
+        self.store.issue(self.user, OtpTypeEnum.EMAIL, "123456", timeout=600)
+        self.store.verify(self.user, OtpTypeEnum.EMAIL, "123456")
+        used = OtpCode.objects.get(code="123456")
+        self.store.issue(self.user, OtpTypeEnum.EMAIL, "654321", timeout=600)
+        self.store.issue(self.user, OtpTypeEnum.EMAIL, "111111", timeout=600)
+
+        codes = {otp.code: otp for otp in OtpCode.objects.filter(user=self.user)}
+        self.assertTrue(codes["123456"].is_used)
+        self.assertEqual(codes["123456"].verified_at, used.verified_at)
+        self.assertEqual(codes["123456"].updated_at, used.updated_at)
+        self.assertTrue(codes["654321"].is_used)
+        self.assertIsNone(codes["654321"].verified_at)
+        self.assertFalse(codes["111111"].is_used)
+
+    def test_expired_code(self):
+        self.store.issue(self.user, OtpTypeEnum.EMAIL, "123456", timeout=-1)
+
+        self.assertEqual(
+            self.store.verify(self.user, OtpTypeEnum.EMAIL, "123456"),
+            OTPVerificationStatusEnum.EXPIRED,
+        )
+
+
+class ScriptedRedis(FakeRedis):
+    """
+    FakeRedis running CONSUME_SCRIPT in Python, Lua is not available.
+    """
+
+    def register_script(self, script):
+        def consume(keys, args):
+            stored = self.get(keys[0])
+            if stored is None or not stored.startswith(f"{args[0]}:".encode()):
+                return None
+            self.delete(keys[0])
+            return stored
+
+        return consume
+
+
+@override_settings(OTP_STORE={"BACKEND": "", "AUDIT": True})
+class RedisOtpStoreTests(TestCase):
+    def setUp(self):
+        self.redis = ScriptedRedis()
+        patcher = mock.patch("core.user.otp.get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = RedisOtpStore()
+        self.user = User.objects.create(username="john", email="john@example.com")
+        self.key = RedisOtpStore.get_key(self.user, OtpTypeEnum.EMAIL)
+
+    def verify(self, code: str) -> str:
+        return self.store.verify(self.user, OtpTypeEnum.EMAIL, code)
+
+    def test_digest_is_keyed_and_scoped(self):
+        digest = RedisOtpStore.get_digest(self.user, OtpTypeEnum.EMAIL, "123456")
+
+        self.assertEqual(len(digest), 64)
+        self.assertNotIn("123456", digest)
+        self.assertEqual(
+            digest, RedisOtpStore.get_digest(self.user, OtpTypeEnum.EMAIL, "123456")
+        )
+        self.assertNotEqual(
+            digest, RedisOtpStore.get_digest(self.user, OtpTypeEnum.EMAIL, "654321")
+        )
+
+    def test_issue_sets_the_ttl(self):
+        self.store.issue(self.user, OtpTypeEnum.EMAIL, "123456", timeout=600)
+
+        self.assertEqual(self.redis.ttl(self.key), 600)
+        self.assertNotIn(b"123456", self.redis.get(self.key))
+
+    def test_code_is_consumed_once(self):
+        self.store.issue(self.user, OtpTypeEnum.EMAIL, "123456", timeout=600)
+
+        self.assertEqual(self.verify("123456"), OTPVerificationStatusEnum.VERIFIED)
+        self.assertEqual(self.verify("123456"), OTPVerificationStatusEnum.INVALID)
+
+    def test_wrong_code_is_invalid_and_keeps_the_code(self):
+        self.store.issue(self.user, OtpTypeEnum.EMAIL, "123456", timeout=600)
+
+        self.assertEqual(self.verify("654321"), OTPVerificationStatusEnum.INVALID)
+        self.assertEqual(self.verify("123456"), OTPVerificationStatusEnum.VERIFIED)
+
+    def test_audit_is_dispatched(self):
+        with mock.patch("core.user.otp.audit_otp_task.delay") as delay:
+            self.store.issue(self.user, OtpTypeEnum.EMAIL, "123456", timeout=600)
+            self.verify("123456")
+
+        issued, verified = [call.kwargs for call in delay.call_args_list]
+        self.assertEqual(issued["user_id"], self.user.pk)
+        self.assertNotIn("verified_at", issued)
+        self.assertEqual(verified["expires_at"], issued["expires_at"])
+        self.assertIsNotNone(verified["verified_at"])
+
+    def test_audit_can_be_disabled(self):
+        with override_settings(OTP_STORE={"BACKEND": "", "AUDIT": False}):
+            with mock.patch("core.user.otp.audit_otp_task.delay") as delay:
+                self.store.issue(self.user, OtpTypeEnum.EMAIL, "123456", timeout=600)
+
+        delay.assert_not_called()
+
+
+class AuditOtpTaskTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="john", email="john@example.com")
+        self.expires_at = time.time() + 600
+
+    def audit(self, **kwargs):
+        audit_otp_task(self.user.pk, OtpTypeEnum.EMAIL, **kwargs)
+
+    def test_verification_before_issue_records_one_row(self):
+        self.audit(expires_at=self.expires_at, verified_at=time.time())
+        self.audit(expires_at=self.expires_at)
+
+        otp = OtpCode.objects.get()
+        self.assertEqual(otp.code, MASKED_CODE)
+        self.assertTrue(otp.is_used)
+        self.assertIsNotNone(otp.verified_at)
+
+    def test_newer_code_replaces_older_in_any_order(self):
+        self.audit(expires_at=self.expires_at + 60)
+        self.audit(expires_at=self.expires_at)
+
+        self.assertEqual(
+            list(
+                OtpCode.objects.order_by("expires_at").values_list("is_used", flat=True)
+            ),
+            [True, False],
+        )
+
+    def test_verification_only_marks_its_code(self):
+        self.audit(expires_at=self.expires_at)
+        self.audit(expires_at=self.expires_at + 60)
+        self.audit(expires_at=self.expires_at, verified_at=time.time())
+
+        older, newer = OtpCode.objects.order_by("expires_at")
+        self.assertIsNotNone(older.verified_at)
+        self.assertIsNone(newer.verified_at)
+        self.assertFalse(newer.is_used)
+
+
+class PurgeOtpCodesTests(TestCase):
+    def test_deletes_expired_codes_in_chunks(self):
+        user = User.objects.create(username="john", email="john@example.com")
+        now = timezone.now()
+        OtpCode.objects.bulk_create(
+            OtpCode(
+                user=user,
+                code="123456",
+                type_otp=OtpTypeEnum.EMAIL,
+                expires_at=now - timedelta(days=days),
+            )
+            for days in (30, 20, 10, 8, 1)
+        )
+
+        cutoff = now - timedelta(days=7)
+        deleted = delete_in_chunks(
+            OtpCode.objects.filter(expires_at__lt=cutoff), batch_size=2
+        )
+
+        self.assertEqual(deleted, 4)
+        self.assertFalse(OtpCode.objects.filter(expires_at__lt=cutoff).exists())
+        self.assertEqual(OtpCode.objects.count(), 1)
+
+
+@override_settings(
+    TOKEN_BLACKLIST={
+        "BACKEND": "core.user.tokens.RedisTokenBlacklist",
+        "BLOOM_CAPACITY": 1000,
+        "BLOOM_ERROR_RATE": 0.01,
+        "SYNC_SECONDS": 60,
+    }
+)
+class RedisTokenBlacklistTests(TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        for target in ("core.user.tokens.get_redis", "core.common.activity.get_redis"):
+            patcher = mock.patch(target, return_value=self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch("core.common.activity.backoff_until", 0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        load_token_blacklist.cache_clear()
+        self.addCleanup(load_token_blacklist.cache_clear)
+        self.blacklist = get_token_blacklist()
+        # Check on the test thread instead of the pub/sub listener.
+        self.blacklist._listener.pid = os.getpid()
+        self.user = User.objects.create_user(username="john", password="secret")
+
+    def test_contains_before_and_after_sync(self):
+        exp = int(time.time()) + 600
+        self.blacklist.add("revoked", exp)
+
+        with mock.patch.object(self.redis, "exists", wraps=self.redis.exists) as exists:
+            self.assertIn("revoked", self.blacklist)
+            self.assertNotIn("valid", self.blacklist)
+            self.assertEqual(exists.call_count, 2)
+
+            self.blacklist.sync()
+            exists.reset_mock()
+            self.assertIn("revoked", self.blacklist)
+            self.assertNotIn("valid", self.blacklist)
+            self.assertEqual(exists.call_count, 1)
+
+        self.assertAlmostEqual(self.redis.ttl("jwt:blacklist:revoked"), 600, delta=1)
+        self.assertEqual(self.redis.published, [("jwt:blacklist:added", "revoked")])
+
+    def test_expired_tokens_are_not_stored(self):
+        self.blacklist.add("expired", int(time.time()) - 1)
+
+        self.assertNotIn("expired", self.blacklist)
+        self.assertEqual(self.redis.published, [])
+
+    def test_tokens_use_the_redis_blacklist(self):
+        token = RefreshToken.for_user(self.user)
+        token.check_blacklist()
+
+        token.blacklist()
+
+        with self.assertRaises(TokenError):
+            token.check_blacklist()
+        self.assertIsNone(token.outstand())
+        self.assertFalse(OutstandingToken.objects.exists())
+
+    def refresh(self, refresh: str):
+        return self.client.post(
+            "/api/auth/refresh/", {"refresh": refresh}, content_type="application/json"
+        )
+
+    def test_login_refresh_logout(self):
+        response = self.client.post(
+            "/api/auth/login/",
+            {"username": "john", "password": "secret"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        login = response.json()["refresh"]
+
+        response = self.refresh(login)
+        self.assertEqual(response.status_code, 200)
+        rotated = response.json()["refresh"]
+
+        # The rotated token is blacklisted and cannot be reused.
+        self.assertEqual(self.refresh(login).status_code, 401)
+
+        response = self.client.post(
+            "/api/auth/logout/", {"refresh": rotated}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.refresh(rotated).status_code, 401)
+        self.assertFalse(OutstandingToken.objects.exists())
+
+    def test_issued_tokens_are_counted_on_the_dashboard(self):
+        token = RefreshToken.for_user(self.user)
+        token.set_jti()
+        token.outstand()
+
+        series = build_snapshot()["series"]["tokens_issued"]
+
+        self.assertEqual(series[-1], 2)
+        self.assertEqual(sum(series), 2)
+        self.assertFalse(OutstandingToken.objects.exists())
@@ -0,0 +1,176 @@
+import logging
+import time
+from functools import lru_cache
+from threading import Lock
+from typing import Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import BlacklistMixin
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from configurations.metrics import blacklist_checks, redis_calls
+from core.common.activity import record_activity
+from core.common.enums import ActivityTypeEnum
+from utils.bloom import BloomFilter
+from utils.redis import get_redis
+from utils.threads import ProcessThread
+
+logger = logging.getLogger(__name__)
+
+BLACKLIST_KEY = "jwt:blacklist:{jti}"
+BLACKLIST_INDEX = "jwt:blacklist"
+BLACKLIST_CHANNEL = "jwt:blacklist:added"
+
+
+class RedisTokenBlacklist:
+    """
+    Blacklist of refresh token JTIs kept in Redis until the tokens expire.
+
+    Each JTI is stored as a key expiring with its token, and indexed in a
+    sorted set by expiry so the whole blacklist can be listed. Every process
+    keeps a Bloom filter of the blacklist: a JTI that is not in the filter is
+    definitely not blacklisted and is accepted without a network call, only
+    possible matches are checked against Redis.
+
+    A listener thread adds JTIs blacklisted by other processes to the filter
+    as they are published, and rebuilds it from the index every
+    `SYNC_SECONDS` and after reconnecting. Until the first rebuild, or while
+    the listener is disconnected, every check goes to Redis.
+    """
+
+    def __init__(self):
+        config = settings.TOKEN_BLACKLIST
+        self.capacity = config["BLOOM_CAPACITY"]
+        self.error_rate = config["BLOOM_ERROR_RATE"]
+        self.sync_seconds = config["SYNC_SECONDS"]
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self._synced_at = None
+        self._bloom_lock = Lock()
+        self._listener = ProcessThread(
+            self._listen, name="jwt-blacklist", on_start=self.unsync
+        )
+
+    def unsync(self):
+        # Check every JTI against Redis until the filter is rebuilt.
+        self._synced_at = None
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(BLACKLIST_CHANNEL)
+                # Rebuild after subscribing so no addition falls in between,
+                # messages received meanwhile wait in the subscription.
+                self.sync()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message:
+                        jti = message["data"]
+                        if isinstance(jti, bytes):
+                            jti = jti.decode("utf-8")
+                        self.remember(jti)
+                    if (
+                        time.monotonic() - self._synced_at >= self.sync_seconds
+                        or self._bloom.count > self._bloom.capacity
+                    ):
+                        self.sync()
+            except Exception as e:
+                logger.warning(f"Token blacklist listener failed: {e}")
+                self.unsync()
+                time.sleep(1)
+
+    def sync(self):
+        redis_calls.add(1, {"operation": "blacklist.sync"})
+        pipeline = get_redis().pipeline(transaction=False)
+        pipeline.zremrangebyscore(BLACKLIST_INDEX, "-inf", time.time())
+        pipeline.zrange(BLACKLIST_INDEX, 0, -1)
+        _, jtis = pipeline.execute()
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti.decode("utf-8"))
+        with self._bloom_lock:
+            self._bloom = bloom
+        self._synced_at = time.monotonic()
+
+    def remember(self, jti: str):
+        # Setting bits is not atomic, concurrent adds could lose each other's.
+        with self._bloom_lock:
+            self._bloom.add(jti)
+
+    def add(self, jti: str, exp: int):
+        timeout = int(exp - time.time())
+        if timeout <= 0:
+            return
+        self.remember(jti)
+        redis_calls.add(1, {"operation": "blacklist.add"})
+        pipeline = get_redis().pipeline(transaction=False)
+        pipeline.set(BLACKLIST_KEY.format(jti=jti), 1, ex=timeout)
+        pipeline.zadd(BLACKLIST_INDEX, {jti: exp})
+        pipeline.publish(BLACKLIST_CHANNEL, jti)
+        pipeline.execute()
+
+    def __contains__(self, jti: str) -> bool:
+        self._listener.ensure_started()
+        if self._synced_at is not None and jti not in self._bloom:
+            blacklist_checks.add(1, {"result": "bloom"})
+            return False
+        blacklist_checks.add(1, {"result": "redis"})
+        redis_calls.add(1, {"operation": "blacklist.check"})
+        return bool(get_redis().exists(BLACKLIST_KEY.format(jti=jti)))
+
+
+@lru_cache
+def load_token_blacklist(backend: str) -> RedisTokenBlacklist:
+    return import_string(backend)()
+
+
+def get_token_blacklist() -> Optional[RedisTokenBlacklist]:
+    """
+    Returns the configured blacklist, None for the database blacklist of
+    simplejwt.
+    """
+    backend = settings.TOKEN_BLACKLIST["BACKEND"]
+    return load_token_blacklist(backend) if backend else None
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    Refresh token checked against the configured blacklist.
+
+    With a blacklist backend, tokens are no longer written to the
+    OutstandingToken table, which only serves the database blacklist. Issued
+    tokens are counted as activity instead, for the dashboard.
+    """
+
+    def check_blacklist(self):
+        blacklist = get_token_blacklist()
+        if blacklist is None:
+            return super().check_blacklist()
+        if self.payload[api_settings.JTI_CLAIM] in blacklist:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        blacklist = get_token_blacklist()
+        if blacklist is None:
+            return super().blacklist()
+        blacklist.add(self.payload[api_settings.JTI_CLAIM], self.payload["exp"])
+
+    def outstand(self):
+        if get_token_blacklist() is None:
+            return super().outstand()
+        # Called on the rotated token, which is a newly issued one.
+        record_activity(ActivityTypeEnum.TOKENS_ISSUED)
+        return None
+
+    @classmethod
+    def for_user(cls, user):
+        if get_token_blacklist() is None:
+            return super().for_user(user)
+        record_activity(ActivityTypeEnum.TOKENS_ISSUED)
+        # Skip BlacklistMixin, which records the token as outstanding.
+        return super(BlacklistMixin, cls).for_user(user)
@@ -0,0 +1,53 @@
+import logging
+import time
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+from configurations.metrics import cleanup_deleted, cleanup_duration
+
+logger = logging.getLogger(__name__)
+
+
+def delete_in_chunks(
+    queryset: QuerySet,
+    batch_size: int = 1000,
+    pause: float = 0.0,
+    max_seconds: Optional[float] = None,
+) -> int:
+    """
+    Delete the rows of `queryset` in batches of `batch_size` primary keys.
+
+    Every batch runs in its own short transaction, so locks are only held on
+    the rows of one batch, and the loop sleeps `pause` seconds between
+    batches to leave room for regular traffic. It stops after `max_seconds`,
+    the next run carries on where it stopped.
+
+    Returns:
+        Number of deleted rows, including cascades
+    """
+    model = queryset.model
+    table = model._meta.db_table
+    started = time.monotonic()
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            count, _ = model._base_manager.filter(pk__in=pks).delete()
+        deleted += count
+
+        if len(pks) < batch_size:
+            break
+        if max_seconds is not None and time.monotonic() - started >= max_seconds:
+            logger.info(f"Stopped deleting from {table} after {max_seconds}s")
+            break
+        if pause:
+            time.sleep(pause)
+
+    duration = time.monotonic() - started
+    cleanup_deleted.add(deleted, {"db.table": table})
+    cleanup_duration.record(duration * 1000, {"db.table": table})
+    return deleted
@@ -1,5 +1,6 @@
 import importlib
 import logging
+from functools import lru_cache
 
 
 logger = logging.getLogger(__name__)
@@ -14,6 +15,7 @@ class ConstanceValue:
         return self.meta_data.get(value, self.meta_data.get("default"))
 
 
+@lru_cache
 def get_class_from_string(class_path: str):
     """
     Retrieves a Python class object from its string path.
@@ -0,0 +1,22 @@
+from functools import lru_cache
+
+from django.conf import settings
+
+
+@lru_cache
+def get_redis():
+    """
+    Return the process-wide Redis client used for raw commands.
+
+    The connection pool is shared by every caller and re-created by redis-py
+    after a fork, so it is safe to use from uwsgi and Celery workers. Commands
+    time out after `REDIS_SOCKET_TIMEOUT` seconds so callers can degrade
+    instead of hanging while Redis is unreachable.
+    """
+    import redis
+
+    return redis.from_url(
+        settings.REDIS_URL,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    )
@@ -0,0 +1,34 @@
+import os
+from threading import Lock, Thread
+from typing import Callable, Optional
+
+
+class ProcessThread:
+    """
+    Daemon thread started on first use in every process.
+
+    Threads do not survive a fork, so each uwsgi or Celery worker starts its
+    own the first time it calls `ensure_started`. `on_start` runs right before
+    the thread starts, to drop whatever state was inherited from the parent.
+    """
+
+    def __init__(
+        self, target: Callable, name: str, on_start: Optional[Callable] = None
+    ):
+        self.target = target
+        self.name = name
+        self.on_start = on_start
+        self.pid = None
+        self._lock = Lock()
+
+    def ensure_started(self):
+        pid = os.getpid()
+        if self.pid == pid:
+            return
+        with self._lock:
+            if self.pid == pid:
+                return
+            if self.on_start is not None:
+                self.on_start()
+            self.pid = pid
+            Thread(target=self.target, name=self.name, daemon=True).start()